@@ -0,0 +1,300 @@
+from collections import Counter
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+from headless import BatchStats
+
+
+class BatchEngine:
+    """
+    K досок одного размера в виде сложенных массивов NumPy (mines, counts, revealed, flagged).
+    За один шаг применяет по одному действию к каждой доске: открытие, аккорд по цифре или метку.
+    Правила совпадают с BoardModel и HeadlessGame: доска из зерна генерируется тем же
+    random.Random, первая открытая мина переносится тем же способом, что и в swap_if_bomb.
+
+    Действие для доски: номер ячейки a = i * cols + j (0 <= a < cells) открывает ячейку,
+    a + cells ставит или снимает метку, отрицательное значение пропускает доску.
+
+    Видимое игроку состояние хранится в буфере state (K, rows, cols) int8 и обновляется на месте:
+    HIDDEN для закрытых ячеек, FLAGGED для помеченных, число мин вокруг для открытых, MINE для открытой мины.
+    Маска допустимых действий action_mask (K, 2 * cells) тоже обновляется на месте.
+
+    Выигрыш дает только пакет: заливка идет по всем доскам сразу, но каждый шаг стоит десятка операций NumPy
+    над всей стопкой. На Hard случайные клики по 1024 доскам примерно в 6-7 раз быстрее модели по партиям
+    в секунду, а одна доска медленнее модели на каждом открытии и метке.
+    """
+
+    HIDDEN = -1
+    FLAGGED = -2
+    MINE = 9
+
+    def __init__(self, boards: int, rows: int, cols: int, num_mines: int, seed: int = None) -> None:
+        """
+        :param boards: Количество досок K.
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param num_mines: Количество мин.
+        :param seed: Зерно генератора NumPy для быстрой генерации досок без отдельных зерен.
+        """
+        self.boards, self.rows, self.cols, self.num_mines = boards, rows, cols, num_mines
+        self.cells = rows * cols
+        shape = (boards, rows, cols)
+        self.mines = np.zeros(shape, dtype=bool)
+        self.counts = np.zeros(shape, dtype=np.int8)
+        self.revealed = np.zeros(shape, dtype=bool)
+        self.flagged = np.zeros(shape, dtype=bool)
+        self.revealed_count = np.zeros(boards, dtype=np.int64)
+        self.done = np.ones(boards, dtype=bool)
+        self.won = np.zeros(boards, dtype=bool)
+        self.state = np.full(shape, self.HIDDEN, dtype=np.int8)
+        self.mask = np.zeros((boards, 2, rows, cols), dtype=bool)
+        self.action_mask = self.mask.reshape(boards, 2 * self.cells)
+        self.rngs = [Random() for _ in range(boards)]
+        self.seeded = np.zeros(boards, dtype=bool)
+        self.generator = np.random.default_rng(seed)
+        self.cells_needed = self.cells - num_mines
+
+    def reset(self, seeds=None, boards=None) -> None:
+        """
+        Генерирует новые доски.
+
+        :param seeds: Зерна досок, по одному на каждую доску из boards. С зернами доски совпадают
+            с досками BoardModel с теми же зернами. Без зерен мины расставляются генератором NumPy
+            сразу для всех досок, это в десятки раз быстрее.
+        :param boards: Номера досок для сброса (по умолчанию все).
+        """
+        boards = np.arange(self.boards) if boards is None else np.asarray(boards)
+        if not len(boards):
+            return
+        flat = self.mines.reshape(self.boards, self.cells)
+        flat[boards] = False
+        if seeds is None:
+            noise = self.generator.random((len(boards), self.cells))
+            placed = np.argpartition(noise, self.num_mines, axis=1)[:, :self.num_mines]
+            flat[boards[:, None], placed] = True
+            self.seeded[boards] = False
+        else:
+            self.seeded[boards] = True
+            for k, seed in zip(boards.tolist(), seeds):
+                rng = self.rngs[k]
+                rng.seed(seed)
+                # sample по range дает те же индексы, что и sample по списку ячеек в make_board
+                flat[k, rng.sample(range(self.cells), self.num_mines)] = True
+        self.counts[boards] = self.count_neighbors(self.mines[boards])
+        self.revealed[boards] = False
+        self.flagged[boards] = False
+        self.revealed_count[boards] = 0
+        self.done[boards] = False
+        self.won[boards] = False
+        self.state[boards] = self.HIDDEN
+        self.update_mask()
+
+    def update_mask(self) -> None:
+        """
+        Пересчитывает маску допустимых действий на месте: открывать можно закрытые ячейки без метки,
+        ставить и снимать метку можно на закрытых ячейках начатой партии. У завершенных партий действий нет.
+        """
+        np.equal(self.state, self.HIDDEN, out=self.mask[:, 0])
+        np.less(self.state, 0, out=self.mask[:, 1])
+        self.mask[self.revealed_count == 0, 1] = False
+        self.mask[self.done] = False
+
+    @staticmethod
+    def count_neighbors(mask: np.ndarray) -> np.ndarray:
+        """Количество отмеченных соседей у каждой ячейки, для стопки досок (K, rows, cols)"""
+        k, rows, cols = mask.shape
+        padded = np.zeros((k, rows + 2, cols + 2), dtype=np.int8)
+        padded[:, 1:-1, 1:-1] = mask
+        counts = np.zeros((k, rows, cols), dtype=np.int8)
+        for di in (0, 1, 2):
+            for dj in (0, 1, 2):
+                if di != 1 or dj != 1:
+                    counts += padded[:, di:di + rows, dj:dj + cols]
+        return counts
+
+    @staticmethod
+    def dilate(mask: np.ndarray) -> np.ndarray:
+        """Расширяет маску на 8 соседей, для стопки досок (K, rows, cols)"""
+        k, rows, cols = mask.shape
+        padded = np.zeros((k, rows + 2, cols + 2), dtype=bool)
+        padded[:, 1:-1, 1:-1] = mask
+        out = mask.copy()
+        for di in (0, 1, 2):
+            for dj in (0, 1, 2):
+                if di != 1 or dj != 1:
+                    out |= padded[:, di:di + rows, dj:dj + cols]
+        return out
+
+    def swap_if_bomb(self, k: int, i: int, j: int) -> bool:
+        """
+        Переносит мину с первой открытой ячейки (i, j) доски k, как BoardModel.swap_if_bomb.
+        Координаты здесь с нуля, генератор вызывается с координатами с единицы, как в модели.
+        """
+        if not self.mines[k, i, j]:
+            return False
+        rng = self.rngs[k]
+        if not self.seeded[k]:
+            # Доска без своего зерна, генератор переноса берет зерно из генератора NumPy
+            rng.seed(int(self.generator.integers(2 ** 63)))
+        di, dj = i, j
+        while self.mines[k, di, dj]:
+            di = rng.randint(1, self.rows) - 1
+            dj = rng.randint(1, self.cols) - 1
+        self.mines[k, i, j] = False
+        self.mines[k, di, dj] = True
+        # Счетчики меняются только в окрестностях 3x3 старой и новой мины, сама ячейка себя не считает
+        counts = self.counts[k]
+        counts[max(i - 1, 0):i + 2, max(j - 1, 0):j + 2] -= 1
+        counts[i, j] += 1
+        counts[max(di - 1, 0):di + 2, max(dj - 1, 0):dj + 2] += 1
+        counts[di, dj] -= 1
+        return True
+
+    def step(self, actions) -> np.ndarray:
+        """
+        Применяет по одному действию к каждой доске.
+        Возвращает количество ячеек, открытых на каждой доске за этот шаг.
+
+        :param actions: Массив (K,) действий, см. описание класса.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        active = (actions >= 0) & ~self.done
+        before = self.revealed_count.copy()
+
+        flags = np.flatnonzero(active & (actions >= self.cells))
+        if len(flags):
+            self.toggle_flags(flags, actions[flags] - self.cells)
+
+        reveals = np.flatnonzero(active & (actions < self.cells))
+        if len(reveals):
+            self.reveal(reveals, actions[reveals])
+        self.update_mask()
+        return self.revealed_count - before
+
+    def toggle_flags(self, boards: np.ndarray, cells: np.ndarray) -> None:
+        """Ставит или снимает метки, только в начатых партиях и только на закрытых ячейках"""
+        i, j = np.divmod(cells, self.cols)
+        allowed = (self.revealed_count[boards] > 0) & ~self.revealed[boards, i, j]
+        boards, i, j = boards[allowed], i[allowed], j[allowed]
+        flagged = ~self.flagged[boards, i, j]
+        self.flagged[boards, i, j] = flagged
+        self.state[boards, i, j] = np.where(flagged, self.FLAGGED, self.HIDDEN)
+
+    def reveal(self, boards: np.ndarray, cells: np.ndarray) -> None:
+        """Открывает ячейки или делает аккорд по цифре, затем заливает нулевые области"""
+        i, j = np.divmod(cells, self.cols)
+        keep = ~self.flagged[boards, i, j]
+        boards, i, j = boards[keep], i[keep], j[keep]
+        if not len(boards):
+            return
+
+        # Первый ход партии: мина под курсором переносится
+        swap = np.flatnonzero((self.revealed_count[boards] == 0) & self.mines[boards, i, j])
+        for k, ci, cj in zip(boards[swap].tolist(), i[swap].tolist(), j[swap].tolist()):
+            self.swap_if_bomb(k, ci, cj)
+
+        seeds = np.zeros((len(boards), self.rows, self.cols), dtype=bool)
+        seeds[np.arange(len(boards)), i, j] = True
+
+        # Аккорд: открытая цифра, вокруг которой помечено столько же ячеек, сколько мин.
+        # Если метки стоят не на минах, партия проиграна без открытия ячеек, как в контроллере
+        lost = np.zeros(len(boards), dtype=bool)
+        chord = self.revealed[boards, i, j] & (self.counts[boards, i, j] > 0)
+        if chord.any():
+            rows = np.flatnonzero(chord)
+            sub = boards[rows]
+            around = self.dilate(seeds[rows]) & ~seeds[rows]
+            flags = self.flagged[sub]
+            valid = (around & flags).sum(axis=(1, 2)) == self.counts[sub, i[rows], j[rows]]
+            wrong = valid & (around & self.mines[sub] & ~flags).any(axis=(1, 2))
+            lost[rows] = wrong
+            seeds[rows] = around & (valid & ~wrong)[:, None, None]
+
+        self.flood(boards, seeds, lost)
+
+    def flood(self, boards: np.ndarray, seeds: np.ndarray, lost: np.ndarray) -> None:
+        """
+        Пакетная заливка: открывает seeds и расширяет открытие от нулевых ячеек,
+        пока на досках появляются новые ячейки. Открытая мина завершает партию поражением.
+
+        :param boards: Номера досок.
+        :param seeds: Маски (len(boards), rows, cols) ячеек, с которых начинается открытие.
+        :param lost: Доски, партия на которых уже проиграна аккордом.
+        """
+        mines = self.mines[boards]
+        closed = ~self.revealed[boards] & ~self.flagged[boards]
+        new = seeds & closed
+        hit = (new & mines).any(axis=(1, 2)) | lost
+        opened = new.copy()
+        zeros = (self.counts[boards] == 0) & ~mines
+        frontier = new & zeros & ~hit[:, None, None]
+        while frontier.any():
+            live = frontier.any(axis=(1, 2))
+            sub = np.flatnonzero(live)
+            grown = self.dilate(frontier[sub]) & closed[sub] & ~opened[sub]
+            opened[sub] |= grown
+            frontier[:] = False
+            frontier[sub] = grown & zeros[sub]
+
+        self.revealed[boards] |= opened
+        self.revealed_count[boards] += opened.sum(axis=(1, 2))
+        state = self.state[boards]
+        state[opened] = np.where(mines, self.MINE, self.counts[boards])[opened]
+        self.state[boards] = state
+        self.done[boards] |= hit
+        won = ~hit & (self.revealed_count[boards] == self.cells_needed)
+        self.won[boards] |= won
+        self.done[boards] |= won
+
+    def random_actions(self, rng: np.random.Generator) -> np.ndarray:
+        """Случайная закрытая ячейка без метки на каждой доске, для стратегии случайных кликов"""
+        noise = rng.random((self.boards, self.cells), dtype=np.float32)
+        noise[self.revealed.reshape(self.boards, self.cells)] = -1.0
+        noise[self.flagged.reshape(self.boards, self.cells)] = -1.0
+        actions = noise.argmax(axis=1)
+        actions[self.done] = -1
+        return actions
+
+
+def run_vector_batch(games: int, rows: int, cols: int, num_mines: int, boards: int, seed: int = 0) -> BatchStats:
+    """
+    Играет серию партий случайными кликами на BatchEngine. Доски расставляются генератором NumPy
+    из зерна seed, завершенные доски сразу получают следующую партию.
+
+    :param games: Количество партий.
+    :param rows: Количество строк.
+    :param cols: Количество столбцов.
+    :param num_mines: Количество мин.
+    :param boards: Количество досок, которые играются одновременно.
+    :param seed: Зерно первой партии.
+    """
+    boards = min(boards, games)
+    engine = BatchEngine(boards, rows, cols, num_mines, seed)
+    stats = BatchStats()
+    rng = np.random.default_rng(seed)
+    moves = np.zeros(boards, dtype=np.int64)
+    sizes = Counter()
+    start = perf_counter()
+    engine.reset()
+    next_game = boards
+    playing = np.ones(boards, dtype=bool)
+    while playing.any():
+        actions = engine.random_actions(rng)
+        actions[~playing] = -1
+        opened = engine.step(actions)
+        moves += actions >= 0
+        sizes.update(opened[opened > 0].tolist())
+
+        finished = np.flatnonzero(playing & engine.done)
+        for k in finished.tolist():
+            stats.add_game(bool(engine.won[k]), int(moves[k]))
+        moves[finished] = 0
+        restart = finished[:max(0, games - next_game)]
+        playing[finished[len(restart):]] = False
+        engine.reset(boards=restart)
+        next_game += len(restart)
+    stats.elapsed = perf_counter() - start
+    stats.bfs_sizes = sizes
+    return stats
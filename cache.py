@@ -0,0 +1,44 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Словарь ограниченного размера: при переполнении удаляется запись, к которой дольше всего не обращались.
+    Считает попадания и промахи get.
+    """
+
+    def __init__(self, maxsize: int = 65536) -> None:
+        """
+        :param maxsize: Наибольшее количество записей.
+        """
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        """Возвращает значение по ключу и отмечает запись как недавно использованную"""
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,40 @@
+from array import array
+
+# Коды новых состояний ячеек. 0-8 - открыта цифра (0 - пустая), 9 - открыта мина при победе
+MINE = 9
+LOST_MINE = 10
+EXPLODED = 11
+WRONG_FLAG = 12
+FLAG = 13
+UNFLAG = 14
+COVER = 15
+LOCK = 16
+
+
+class ChangeList:
+    """
+    Упорядоченный список изменений ячеек, который модель отдает всем отрисовщикам: сетке кнопок,
+    сетевому клиенту, воспроизведению. Хранит два плоских массива: номера ячеек (x - 1) * cols + (y - 1)
+    и коды новых состояний, без кортежа на каждую ячейку.
+    """
+
+    __slots__ = ("cells", "codes")
+
+    def __init__(self, cells: array = None, codes: array = None) -> None:
+        self.cells = array("I") if cells is None else cells
+        self.codes = array("B") if codes is None else codes
+
+    def add(self, cell: int, code: int) -> None:
+        self.cells.append(cell)
+        self.codes.append(code)
+
+    def since(self, start: int) -> "ChangeList":
+        """Возвращает изменения, добавленные после позиции start"""
+        return ChangeList(self.cells[start:], self.codes[start:])
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __iter__(self):
+        """Пары (номер ячейки, код)"""
+        return zip(self.cells, self.codes)
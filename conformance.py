@@ -0,0 +1,192 @@
+from collections import defaultdict
+from random import Random
+from time import perf_counter
+
+from changes import MINE
+from headless import HeadlessGame
+
+
+class ModelBackend:
+    """
+    Эталонный движок: HeadlessGame поверх BoardModel, те же правила, что у окна игры.
+    Интерфейс движка для проверки: new_game, reveal, flag, mines и flags; ячейки - номера (x - 1) * cols + (y - 1).
+    """
+
+    name = "model"
+
+    def __init__(self, rows: int, cols: int, num_mines: int) -> None:
+        self.game = HeadlessGame(rows, cols, num_mines)
+
+    def new_game(self, seed: int) -> None:
+        self.game.new_game(seed)
+
+    def reveal(self, x: int, y: int) -> tuple[str, set]:
+        """Левый клик. Возвращает статус ("play", "win", "lose") и номера открытых им ячеек"""
+        status, changes = self.game.reveal(x, y)
+        return status, {cell for cell, code in changes if code <= MINE}
+
+    def flag(self, x: int, y: int) -> None:
+        self.game.toggle_flag(x, y)
+
+    def mines(self) -> set:
+        model = self.game.model
+        return {model.cell_id(x, y) for x, y in model.mines_cells}
+
+    def flags(self) -> set:
+        model = self.game.model
+        return {model.cell_id(x, y) for x, y in model.marked_cells}
+
+
+class VectorBackend:
+    """Векторный движок BatchEngine с одной доской, доски из тех же зерен, что у модели"""
+
+    name = "vector"
+
+    def __init__(self, rows: int, cols: int, num_mines: int) -> None:
+        from batch_engine import BatchEngine
+
+        self.engine = BatchEngine(1, rows, cols, num_mines)
+        self.cols = cols
+
+    def new_game(self, seed: int) -> None:
+        self.engine.reset(seeds=[seed])
+
+    def reveal(self, x: int, y: int) -> tuple[str, set]:
+        engine = self.engine
+        before = engine.revealed[0].copy()
+        finished = bool(engine.done[0])
+        engine.step([(x - 1) * self.cols + y - 1])
+        opened = set((engine.revealed[0] & ~before).ravel().nonzero()[0].tolist())
+        if finished or not engine.done[0]:
+            return "play", opened
+        return ("win" if engine.won[0] else "lose"), opened
+
+    def flag(self, x: int, y: int) -> None:
+        self.engine.step([self.engine.cells + (x - 1) * self.cols + y - 1])
+
+    def mines(self) -> set:
+        return set(self.engine.mines[0].ravel().nonzero()[0].tolist())
+
+    def flags(self) -> set:
+        return set(self.engine.flagged[0].ravel().nonzero()[0].tolist())
+
+
+BACKENDS = {ModelBackend.name: ModelBackend, VectorBackend.name: VectorBackend}
+
+
+def action_stream(seed: int, rows: int, cols: int, length: int) -> list[tuple]:
+    """
+    Случайные действия партии, не зависящие от состояния движка: ("left" или "right", x, y).
+    Левые клики попадают и в открытые цифры, поэтому в потоке есть аккорды, а клики по меткам
+    и по открытым ячейкам проверяют, что движки одинаково их пропускают.
+    """
+    rng = Random(seed)
+    return [("right" if rng.random() < 0.2 else "left", rng.randint(1, rows), rng.randint(1, cols))
+            for _ in range(length)]
+
+
+class ConformanceRun:
+    """
+    Разностная проверка движка-кандидата против эталонной модели: оба получают одни и те же доски
+    и одни и те же потоки действий. Сравниваются мины после генерации и после первого клика
+    (перенос мины swap_if_bomb), открытые каждым кликом ячейки, метки, статус и исход партии.
+    Время каждой операции меряется отдельно для каждого движка.
+    """
+
+    def __init__(self, candidate, reference, rows: int, cols: int, max_mismatches: int = 20) -> None:
+        """
+        :param candidate: Проверяемый движок.
+        :param reference: Эталонный движок.
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param max_mismatches: После скольких расхождений проверка останавливается.
+        """
+        self.candidate, self.reference = candidate, reference
+        self.rows, self.cols = rows, cols
+        self.max_mismatches = max_mismatches
+        self.mismatches = []
+        self.games = 0
+        self.actions = 0
+        # {(движок, операция): [вызовов, секунд]}
+        self.timings = defaultdict(lambda: [0, 0.0])
+
+    def timed(self, backend, operation: str, *args):
+        start = perf_counter()
+        result = getattr(backend, operation)(*args)
+        timing = self.timings[backend.name, operation]
+        timing[0] += 1
+        timing[1] += perf_counter() - start
+        return result
+
+    def mismatch(self, seed: int, index: int, action: tuple, what: str, expected, got) -> None:
+        self.mismatches.append((seed, index, action, what, expected, got))
+
+    def run(self, games: int, seed: int = 0, length: int = None) -> bool:
+        """
+        Играет games партий с зернами seed, seed + 1, ... Возвращает True, если расхождений нет.
+
+        :param length: Действий в потоке партии (по умолчанию вдвое больше, чем ячеек).
+        """
+        length = length or 2 * self.rows * self.cols
+        for game_seed in range(seed, seed + games):
+            self.play(game_seed, length)
+            self.games += 1
+            if len(self.mismatches) >= self.max_mismatches:
+                break
+        return not self.mismatches
+
+    def play(self, seed: int, length: int) -> None:
+        """Одна партия: останавливается на первом расхождении или на конце партии у эталона"""
+        reference, candidate = self.reference, self.candidate
+        self.timed(reference, "new_game", seed)
+        self.timed(candidate, "new_game", seed)
+        if reference.mines() != candidate.mines():
+            self.mismatch(seed, -1, None, "mines", len(reference.mines()), len(candidate.mines()))
+            return
+        first = True
+        for index, action in enumerate(action_stream(seed, self.rows, self.cols, length)):
+            kind, x, y = action
+            self.actions += 1
+            if kind == "right":
+                self.timed(reference, "flag", x, y)
+                self.timed(candidate, "flag", x, y)
+                if reference.flags() != candidate.flags():
+                    self.mismatch(seed, index, action, "flags", sorted(reference.flags()), sorted(candidate.flags()))
+                    return
+                continue
+
+            expected = self.timed(reference, "reveal", x, y)
+            got = self.timed(candidate, "reveal", x, y)
+            if first and expected[1]:
+                first = False
+                if reference.mines() != candidate.mines():
+                    self.mismatch(seed, index, action, "swap_if_bomb",
+                                  sorted(reference.mines() - candidate.mines()),
+                                  sorted(candidate.mines() - reference.mines()))
+                    return
+            if expected[0] != got[0]:
+                self.mismatch(seed, index, action, "status", expected[0], got[0])
+                return
+            if expected[1] != got[1]:
+                self.mismatch(seed, index, action, "revealed", sorted(expected[1] - got[1]), sorted(got[1] - expected[1]))
+                return
+            if expected[0] != "play":
+                return
+
+    def report(self) -> str:
+        name, reference = self.candidate.name, self.reference.name
+        lines = [
+            f"{name} vs {reference}: {self.games} games, {self.actions} actions, {len(self.mismatches)} mismatches",
+            f"{'Operation':<12}{'Calls':>10}{f'{reference} us':>14}{f'{name} us':>14}{'Speedup':>10}",
+        ]
+        for operation in ("new_game", "reveal", "flag"):
+            calls, reference_time = self.timings[reference, operation]
+            _, candidate_time = self.timings[name, operation]
+            if not calls:
+                continue
+            speedup = reference_time / candidate_time if candidate_time else 0.0
+            lines.append(f"{operation:<12}{calls:>10}{reference_time / calls * 1e6:>14.1f}"
+                         f"{candidate_time / calls * 1e6:>14.1f}{speedup:>9.2f}x")
+        for seed, index, action, what, expected, got in self.mismatches:
+            lines.append(f"seed {seed}, action {index} {action}: {what} differs, expected {expected}, got {got}")
+        return "\n".join(lines)
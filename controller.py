@@ -1,33 +1,157 @@
-from model import MinesweeperModel
-from view import MinesweeperView
+import json
+from collections import deque
+from functools import partial
+from random import Random
+from time import perf_counter
+
+from metrics import GameMetrics, Timed
+from model import MinesweeperModel, generate_board
+from savegame import SavedGame
+from tasks import TaskExecutor
+from topology import get_topology
+from view import MinesweeperView, GameFieldButton
+
+METRICS_INTERVAL_MS = 10000
 
 
 class MinesweeperController:
-    def __init__(self):
-        self.model = MinesweeperModel(self)
+    def __init__(self, seed: int = None, submissions: str = None, metrics_path: str = None,
+                 metrics_port: int = None):
+        """
+        :param seed: Зерно генератора досок, для воспроизводимых партий (по умолчанию случайное).
+        :param submissions: Файл JSON lines, в который дописываются выигранные партии для проверки рекордов.
+        :param metrics_path: Файл, в который раз в 10 секунд и при выходе выгружаются метрики в формате Prometheus.
+        :param metrics_port: Порт на localhost, на котором метрики отдаются по GET /metrics.
+        """
+        self.seed = seed
+        self.submissions = submissions
+        self.metrics = GameMetrics(lambda: GameFieldButton.configures)
+        self.metrics_path = metrics_path
+        if metrics_port is not None:
+            self.metrics.serve(metrics_port)
+        self.recorder = None
+        self.input_queue = deque()
+        self.input_job = None
+        self.model = MinesweeperModel(self, seed)
+        # Партия сохраняется и продолжается только без заданного зерна: запуск с зерном должен быть воспроизводимым
+        self.saved = SavedGame() if seed is None else None
+        elapsed = self.resume_game()
         self.view = MinesweeperView(self)
         self.view.protocol("WM_DELETE_WINDOW", self.program_close_handler)
+        self.executor = TaskExecutor(self.view, self.view.bottom_panel.set_busy)
+        if elapsed is not None:
+            self.render_changes()
+            self.view.bottom_panel.bomb_counter.set_bomb_counter(len(self.model.marked_cells))
+            self.view.bottom_panel.timer.resume_timer(elapsed)
+        else:
+            self.metrics.games_started.inc()
+            if self.saved:
+                self.saved.start(self.model)
+        if self.metrics_path:
+            self.view.after(METRICS_INTERVAL_MS, self.dump_metrics)
+
+    def resume_game(self):
+        """
+        Восстанавливает незаконченную партию из файла сохранения, если он есть и доска подходит
+        к одному из уровней сложности. Возвращает время партии или None
+        """
+        if not self.saved:
+            return None
+        size = self.saved.open()
+        for difficulty, board_size in self.model.mapp.items():
+            if board_size != size:
+                continue
+            current = self.model.difficulty
+            self.model.set_difficulty(difficulty)
+            elapsed = self.saved.restore(self.model)
+            if elapsed is None:
+                self.model.set_difficulty(current)
+            else:
+                # Журнал ходов не сохраняется, поэтому выигрыш продолженной партии не заявляется на рекорд
+                self.model.move_log_complete = False
+            return elapsed
+        return None
 
     def program_close_handler(self):
         """
         Обработчик закрытия программы
         """
         self.view.withdraw()
-        self.model.save_settings()
+        self.executor.shutdown()
+        if self.saved:
+            self.saved.save_progress(self.view.bottom_panel.timer.get_elapsed(), self.model.clicks)
+            self.saved.close()
+        if self.recorder:
+            self.recorder.save()
+        with Timed(self.metrics.records_save_seconds):
+            self.model.save_settings()
+        if self.metrics_path:
+            self.metrics.write(self.metrics_path)
+        self.metrics.shutdown()
         self.view.destroy()
 
-    def new_game_handler(self, event):
+    def dump_metrics(self):
+        """
+        Выгружает метрики в файл и планирует следующую выгрузку
+        """
+        self.metrics.write(self.metrics_path)
+        self.view.after(METRICS_INTERVAL_MS, self.dump_metrics)
+
+    def get_metrics_summary(self) -> str:
+        """
+        Сводка метрик для окна отладки
+        """
+        return self.metrics.summary()
+
+    def render_done(self, seconds: float):
+        """
+        Получает от поля время отрисовки изменений
         """
-        Обработчик кнопки New Game. Начинает новую игру
+        self.metrics.render_seconds.observe(seconds)
+
+    def new_game_handler(self, event, resize: bool = False):
+        """
+        Обработчик кнопки New Game. Начинает новую игру.
+        Доска генерируется в фоновом потоке, до ее готовности поле заблокировано.
+
+        :param resize: Подогнать размер окна под новую доску и показать окно, когда доска будет готова.
         """
+        self.record_action("new_game")
         if self.view.modal:
-            self.view.modal.destroy()
-        self.model.game_over = False
+            self.view.modal.hide()
+        # Старая партия завершается сразу, клики по полю ждут новую доску
+        self.model.game_over = True
+        self.model.block_game_field = True
+        self.clear_input()
+        self.view.game_field.cancel_reveal()
+        self.view.bottom_panel.timer.clear_timer()
+        # Генератор получает копию rng: отмененная генерация не сдвигает последовательность досок.
+        # Зерно партии берется так же, как в BoardModel.reload_board, чтобы доску можно было восстановить
+        rng = Random()
+        rng.setstate(self.model.rng.getstate())
+        seed = rng.getrandbits(32)
+        rng.seed(seed)
+        model = self.model
+        topology = get_topology(model.topology_name, model.rows, model.cols)
+        self.executor.submit("new_game", generate_board, model.rows, model.cols, model.num_mines, rng, topology,
+                             on_done=partial(self.apply_new_board, rng, seed, resize))
+
+    def apply_new_board(self, rng: Random, seed: int, resize: bool, generated: tuple):
+        """
+        Получает доску из фонового потока и начинает на ней игру
+        """
+        self.model.rng.setstate(rng.getstate())
         self.model.block_game_field = False
-        self.model.reload_board()
+        self.model.reload_board(generated, seed)
+        self.metrics.games_started.inc()
+        if self.saved:
+            self.saved.start(self.model)
         self.view.game_field.update_buttons()
         self.view.bottom_panel.timer.clear_timer()
         self.view.bottom_panel.bomb_counter.clear_bomb_counter()
+        if resize:
+            self.view.update_window_size()
+            self.view.deiconify()
         self.view.update_idletasks()
 
     def pause_game_handler(self, event):
@@ -54,7 +178,8 @@ class MinesweeperController:
 
         :param time: Время игрока, для вставки в таблицу
         """
-        new_records = self.model.scoreboard.get_modify_table_records(time)
+        stats = self.model.get_game_stats(self.view.bottom_panel.timer.get_elapsed())
+        new_records = self.model.scoreboard.get_modify_table_records(time, stats)
         response = self.view.show_table_with_score(new_records, "root")
         if response:
             self.model.scoreboard.update_table_records(response)
@@ -69,80 +194,216 @@ class MinesweeperController:
             return
         self.view.withdraw()
         current_difficulty = self.view.top_panel.difficulty_box.get()
+        self.record_action("difficulty", current_difficulty)
         self.model.set_difficulty(current_difficulty)
-        self.new_game_handler(event)
-        self.view.update_window_size()
-        self.view.deiconify()
+        self.new_game_handler(event, resize=True)
 
     def left_click_handler(self, button):
         """
-        Обработка левого клика по игровому полю
+        Обработка левого клика по игровому полю. Клик ставится в очередь ввода
         """
+        self.record_action("left", button.coord_x, button.coord_y)
+        self.queue_input("left", button)
 
-        # Начало игры. Если игра закончилась или установлена метка, то return иначе старт новой игры
-        if self.model.block_game_field or button["text"] and button.is_bomb:
+    def right_click_handler(self, button):
+        """
+        Обработка правого клика по игровому полю. Клик ставится в очередь ввода
+        """
+        self.record_action("right", button.coord_x, button.coord_y)
+        self.queue_input("right", button)
+
+    def queue_input(self, kind: str, button):
+        """
+        Ставит клик в очередь ввода. Очередь обрабатывается, когда Tk разберет все накопившиеся события,
+        поэтому серия быстрых кликов дает один проход по модели и одну перерисовку.
+        Клики, которые ничего не изменят, отбрасываются сразу, порядок остальных сохраняется.
+        """
+        x, y = button.coord_x, button.coord_y
+        model = self.model
+        # Клики считаются для эффективности до отбрасывания: лишний клик тоже клик игрока
+        if kind == "left" and not model.block_game_field and (x, y) not in model.marked_cells:
+            model.clicks += 1
+        elif kind == "right" and model.get_game_status() and (x, y) not in model.uncover_cells:
+            model.clicks += 1
+
+        queue = self.input_queue
+        if queue:
+            last_kind, last_button = queue[-1]
+            if last_button is button and kind == last_kind:
+                if kind == "right":
+                    # Две метки подряд на одной ячейке отменяют друг друга
+                    queue.pop()
+                    return
+                if (x, y) in model.uncover_cells:
+                    # Повторный chord по той же цифре ничего не откроет
+                    return
+        elif self.is_noop(kind, x, y):
             return
-        self.is_first_click_on_the_board(button)
+        queue.append((kind, button))
+        if self.input_job is None:
+            self.input_job = self.view.after_idle(self.process_input)
 
-        # Обработка клика
-        bombs_set = set()
-        if button["text"]:
-            bombs_set |= self.clicked_on_the_number(button)
-        else:
-            bombs_set |= self.clicked_on_an_empty_cell(button)
+    def is_noop(self, kind: str, x: int, y: int) -> bool:
+        """
+        Проверяет по текущему состоянию модели, что клик ничего не изменит.
+        Верно только для пустой очереди: клики в очереди могут изменить состояние.
+        """
+        model = self.model
+        if kind == "right":
+            return not model.get_game_status() or (x, y) in model.uncover_cells
+        if model.block_game_field or (x, y) in model.marked_cells:
+            return True
+        # Открытая пустая ячейка или цифра, вокруг которой помечено не столько мин, сколько нужно
+        return (x, y) in model.uncover_cells and (not model.board[x][y]
+                                                  or model.flag_counts[x][y] != model.board[x][y])
+
+    def process_input(self):
+        """
+        Применяет очередь кликов к модели и один раз отрисовывает накопленный моделью список изменений.
+        После победы или поражения оставшиеся клики отбрасываются.
+        """
+        self.input_job = None
+        queue = self.input_queue
+        status, button = "play", None
+        model_seconds = self.metrics.model_seconds
+        while queue and status == "play":
+            kind, button = queue.popleft()
+            start = perf_counter()
+            if kind == "left":
+                status = self.apply_left_click(button)
+            else:
+                x, y = button.coord_x, button.coord_y
+                if self.model.get_game_status() and (x, y) not in self.model.uncover_cells:
+                    self.log_move("right", x, y)
+                    self.view.bottom_panel.bomb_counter.update_bomb_counter(self.model.toggle_mark(x, y))
+            model_seconds.observe(perf_counter() - start)
+        queue.clear()
 
-        # Проверка на поражение или победу
-        if len(bombs_set) == 1 and self.model.check_lose(bombs_set):
+        if status == "win":
+            self.is_win(button)
+        elif status == "lose":
             self.is_lose(button)
-        elif self.model.check_win():
-            self.is_win()
         else:
-            self.view.game_field.uncover_the_clearing(bombs_set)
+            self.render_changes()
 
-    def right_click_handler(self, button):
+    def flush_input(self):
+        """Сразу обрабатывает очередь ввода, например перед отменой хода"""
+        if self.input_job is not None:
+            self.view.after_cancel(self.input_job)
+            self.process_input()
+
+    def clear_input(self):
+        """Отбрасывает необработанные клики, например при новой игре"""
+        if self.input_job is not None:
+            self.view.after_cancel(self.input_job)
+            self.input_job = None
+        self.input_queue.clear()
+
+    def apply_left_click(self, button) -> str:
         """
-        Обработка правого клика по игровому полю
+        Применяет левый клик к модели. Возвращает "play", "win" или "lose".
         """
-        if self.model.get_game_status() and not button.is_open:
-            button.mark_the_bomb()
-            self.model.set_mark_bomb(button.bomb_mark, button.coord_x, button.coord_y)
-            self.view.bottom_panel.bomb_counter.update_bomb_counter(button["text"])
+        # Начало игры. Если игра закончилась или установлена метка, то return иначе старт новой игры
+        x, y = button.coord_x, button.coord_y
+        if self.model.block_game_field or (x, y) in self.model.marked_cells:
+            return "play"
+        self.is_first_click_on_the_board(button)
+        self.log_move("left", x, y)
 
-    def clicked_on_an_empty_cell(self, button) -> set:
+        # Обработка клика
+        if (x, y) in self.model.uncover_cells and self.model.board[x][y]:
+            response = self.model.compare_marked_bombs_with_real_ones(x, y)
+            if response == 'lose':
+                return "lose"
+            if response is True:
+                self.metrics.bfs_cells.observe(len(self.model.bfs(x, y, chord=True)))
+        else:
+            # Проверка на поражение или победу
+            opened = self.model.bfs(x, y)
+            self.metrics.bfs_cells.observe(len(opened))
+            if opened and self.model.check_lose(x, y):
+                return "lose"
+        if self.model.check_win():
+            return "win"
+        return "play"
+
+    def undo_handler(self, event):
         """
-        Переход, если игрок кликнул по закрытой ячейке
+        Обработчик Ctrl+Z. Отменяет последний ход, в том числе проигрышный
         """
-        return self.model.bfs(button.coord_x, button.coord_y)
+        self.record_action("undo")
+        if self.executor.is_pending("new_game"):
+            return
+        self.flush_input()
+        # Изменения отмены встают в очередь отрисовки после незавершенного открытия, порядок сохраняется
+        with Timed(self.metrics.model_seconds):
+            move = self.model.undo()
+        if move is None:
+            return
+        self.log_move("undo")
+        if move[0] == "flag":
+            self.view.bottom_panel.bomb_counter.update_bomb_counter(not move[3])
+        elif move[5] and self.saved:
+            # Отменен первый клик с переносом мины, в сохранении снова исходная доска
+            self.saved.write_board(self.model)
+        if self.saved:
+            # Отмена поражения возвращает партию в игру
+            self.saved.set_finished(False)
+        self.render_changes()
+        # Таймер идет и после отмены первого клика: время ходов в журнале не идет назад,
+        # иначе проверка рекорда отклонит партию
+        self.view.bottom_panel.timer.start_timer()
 
-    def clicked_on_the_number(self, button) -> set:
+    def redo_handler(self, event):
         """
-        Переход, если игрок кликнул по цифре
+        Обработчик Ctrl+Y. Повторяет отмененный ход и проверяет его результат, как после клика
         """
-        x, y = button.coord_x, button.coord_y
-        bombs_set = self.view.game_field.get_coordinates_marked_bombs_nearby(x, y)
-        response = self.model.compare_marked_bombs_with_real_ones(bombs_set, x, y)
-        if response is True:
-            return self.model.bfs(x, y, bombs_set)
-        if response == 'lose':
+        self.record_action("redo")
+        if self.executor.is_pending("new_game"):
+            return
+        self.flush_input()
+        if self.model.block_game_field:
+            return
+        with Timed(self.metrics.model_seconds):
+            move = self.model.redo()
+        if move is None:
+            return
+        self.log_move("redo")
+        if move[0] == "reveal" and move[5] and self.saved:
+            self.saved.write_board(self.model)
+        kind, x, y = move[:3]
+        button = self.view.game_field.buttons[x - 1][y - 1]
+        self.view.bottom_panel.timer.start_timer()
+        if kind == "flag":
+            self.view.bottom_panel.bomb_counter.update_bomb_counter(move[3])
+            self.render_changes()
+        elif move[4]:
             self.is_lose(button)
-        return set()
-            
+        elif self.model.check_win():
+            self.is_win(button)
+        else:
+            self.render_changes()
+
     def is_first_click_on_the_board(self, button):
         """
         Проверка перед новой игрой, если идет уже идет, то возвращает None
         """
         if not self.model.get_game_status():
             self.model.game_over = False
-            if self.model.swap_if_bomb(button.coord_x, button.coord_y):
-                self.view.game_field.update_buttons()
+            # Значения ячеек приходят в списке изменений, поэтому после подмены мины кнопки не обновляются
+            if self.model.swap_if_bomb(button.coord_x, button.coord_y) and self.saved:
+                self.saved.write_board(self.model)
             self.view.bottom_panel.timer.start_timer()
 
-    def is_win(self):
+    def is_win(self, button):
         """
         Скрипт победы
         """
         self.set_general_game_ending_options()
-        self.view.game_field.uncover_all_buttons()
+        self.metrics.games_won.inc()
+        self.model.emit_win(button.coord_x, button.coord_y)
+        self.render_changes()
+        self.save_submission()
         time = self.view.bottom_panel.timer.get_strip_time()
         if self.model.scoreboard.check_time(time):
             self.program_call_scoreboard_handler(time)
@@ -154,10 +415,19 @@ class MinesweeperController:
         Скрипт поражения
         """
         self.set_general_game_ending_options()
-        self.view.game_field.uncover_all_mines(self.model.mines_cells)
-        self.view.game_field.highlight_explosion(button)
+        self.model.emit_loss(button.coord_x, button.coord_y)
+        self.render_changes()
         self.view.lose_notify()
 
+    def render_changes(self):
+        """
+        Передает накопленный моделью список изменений в view
+        """
+        changes = self.model.take_changes()
+        if self.saved:
+            self.saved.apply_changes(changes, self.view.bottom_panel.timer.get_elapsed(), self.model.clicks)
+        self.view.game_field.apply_changes(changes)
+
     def set_general_game_ending_options(self):
         """
         Применяет общие параметры при победе или поражении
@@ -165,6 +435,34 @@ class MinesweeperController:
         self.model.game_over = True
         self.model.block_game_field = True
         self.view.bottom_panel.timer.stop_timer()
+        if self.saved:
+            self.saved.set_finished(True)
+
+    def log_move(self, kind: str, x: int = 0, y: int = 0) -> None:
+        """
+        Записывает примененный ход в журнал партии модели с временем таймера
+        """
+        self.model.log_move(kind, x, y, self.view.bottom_panel.timer.get_elapsed())
+
+    def save_submission(self) -> None:
+        """
+        Дописывает выигранную партию в файл заявок на рекорд, если он задан.
+        Партии, продолженные из сохранения, пропускаются: их журнал ходов неполон и проверку не пройдет
+        """
+        if not self.submissions:
+            return
+        replay = self.model.get_replay(round(self.view.bottom_panel.timer.get_elapsed(), 3))
+        if replay is None:
+            return
+        with open(self.submissions, "a") as file:
+            file.write(json.dumps(replay, separators=(",", ":")) + "\n")
+
+    def record_action(self, *action) -> None:
+        """
+        Передает действие игрока в записывающий скрипт, если запись включена
+        """
+        if self.recorder:
+            self.recorder.record(*action)
 
     def get_current_difficulty(self) -> str:
         """
@@ -184,12 +482,6 @@ class MinesweeperController:
         """
         return self.model.num_mines
 
-    def get_cell_value(self, i: int, j: int) -> int:
-        """
-        Запрашивает у model значение ячейки
-        """
-        return self.model.board[i][j]
-
     def run(self):
         self.view.mainloop()
 
@@ -0,0 +1,125 @@
+import numpy as np
+
+from batch_engine import BatchEngine
+
+
+class VectorMinesweeperEnv:
+    """
+    Векторное окружение в стиле Gym поверх BatchEngine: num_envs партий, шаг принимает по действию на партию.
+
+    Наблюдения и маски действий не копируются: reset и step возвращают представления буферов движка
+    state и action_mask, которые обновляются на месте на следующем шаге. Если наблюдение нужно сохранить,
+    его копирует вызывающий код.
+
+    Награда: доля открытых за шаг ячеек от необходимых для победы, +1 за победу, -1 за поражение,
+    invalid_penalty за действие, которое ничего не изменило.
+    При autoreset завершенные партии перезапускаются в начале следующего шага, их действия на этом шаге
+    игнорируются (как next-step autoreset в Gymnasium).
+    """
+
+    def __init__(self, num_envs: int, rows: int, cols: int, num_mines: int, autoreset: bool = True,
+                 invalid_penalty: float = -0.01) -> None:
+        """
+        :param num_envs: Количество партий.
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param num_mines: Количество мин.
+        :param autoreset: Перезапускать завершенные партии автоматически.
+        :param invalid_penalty: Награда за действие, которое ничего не изменило.
+        """
+        self.num_envs = num_envs
+        self.autoreset = autoreset
+        self.invalid_penalty = invalid_penalty
+        self.engine = BatchEngine(num_envs, rows, cols, num_mines)
+        self.observation_shape = (rows, cols)
+        self.action_count = 2 * self.engine.cells
+        self.next_seed = None
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.terminated = np.zeros(num_envs, dtype=bool)
+        self.truncated = np.zeros(num_envs, dtype=bool)
+
+    def reset(self, seed: int = None) -> tuple[np.ndarray, dict]:
+        """
+        Начинает новые партии во всех окружениях.
+
+        :param seed: Если передан, партия k получает зерно seed + k и совпадает с BoardModel с тем же зерном,
+            а автоматически перезапущенные партии продолжают нумерацию зерен.
+        """
+        engine = self.engine
+        if seed is None:
+            self.next_seed = None
+            engine.reset()
+        else:
+            engine.reset(range(seed, seed + self.num_envs))
+            self.next_seed = seed + self.num_envs
+        self.terminated[:] = False
+        return engine.state, self.info()
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict]:
+        """
+        Применяет действия и возвращает (observations, rewards, terminated, truncated, info).
+        """
+        engine = self.engine
+        actions = np.array(actions, dtype=np.int64)
+        if self.autoreset:
+            finished = np.flatnonzero(self.terminated)
+            if len(finished):
+                self.reset_boards(finished)
+                actions[finished] = -1
+
+        valid = (actions >= 0) & engine.action_mask[np.arange(self.num_envs), np.maximum(actions, 0)]
+        was_done = engine.done.copy()
+        opened = engine.step(np.where(valid, actions, -1))
+
+        rewards = self.rewards
+        np.divide(opened, engine.cells_needed, out=rewards, casting="unsafe")
+        rewards[(actions >= 0) & ~valid] = self.invalid_penalty
+        rewards[was_done] = 0.0
+        ended = engine.done & ~was_done
+        rewards[ended & engine.won] += 1.0
+        rewards[ended & ~engine.won] = -1.0
+        np.copyto(self.terminated, engine.done)
+        return engine.state, rewards, self.terminated, self.truncated, self.info()
+
+    def reset_boards(self, boards: np.ndarray) -> None:
+        """Перезапускает отдельные партии, сохраняя нумерацию зерен, если она задана"""
+        if self.next_seed is None:
+            self.engine.reset(boards=boards)
+        else:
+            self.engine.reset(range(self.next_seed, self.next_seed + len(boards)), boards)
+            self.next_seed += len(boards)
+        self.terminated[boards] = False
+
+    def info(self) -> dict:
+        """Дополнительные данные шага: маска действий и результаты партий, тоже без копирования"""
+        return {"action_mask": self.engine.action_mask, "won": self.engine.won}
+
+
+class MinesweeperEnv:
+    """
+    Одиночное окружение в стиле Gym: reset(seed) и step(action) для одной партии.
+    Наблюдение (rows, cols) и маска действий - представления буферов движка, как в VectorMinesweeperEnv.
+    """
+
+    def __init__(self, rows: int, cols: int, num_mines: int, invalid_penalty: float = -0.01) -> None:
+        """
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param num_mines: Количество мин.
+        :param invalid_penalty: Награда за действие, которое ничего не изменило.
+        """
+        self.vector = VectorMinesweeperEnv(1, rows, cols, num_mines, autoreset=False,
+                                           invalid_penalty=invalid_penalty)
+        self.action = np.zeros(1, dtype=np.int64)
+        self.observation = self.vector.engine.state[0]
+        self.action_mask = self.vector.engine.action_mask[0]
+
+    def reset(self, seed: int = None) -> tuple[np.ndarray, dict]:
+        self.vector.reset(seed)
+        return self.observation, {"action_mask": self.action_mask}
+
+    def step(self, action: int) -> tuple[np.ndarray, float, bool, bool, dict]:
+        self.action[0] = action
+        _, rewards, terminated, truncated, _ = self.vector.step(self.action)
+        info = {"action_mask": self.action_mask, "won": bool(self.vector.engine.won[0])}
+        return self.observation, float(rewards[0]), bool(terminated[0]), bool(truncated[0]), info
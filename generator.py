@@ -0,0 +1,138 @@
+import os
+from multiprocessing import Pool
+from random import Random
+from time import perf_counter
+
+# Диапазоны 3BV по умолчанию: примерно верхний дециль досок каждого уровня сложности
+TARGET_3BV = {"Easy": (22, 30), "Medium": (80, 100), "Hard": (200, 230)}
+
+
+def count_3bv_from_mines(rows: int, cols: int, mines, limit: int = None) -> int:
+    """
+    Считает 3BV по одним координатам мин, без построения доски с числами соседей:
+    для 3BV достаточно знать, какие ячейки - мины, а какие соседствуют с миной (цифры).
+    Разметка областей нулей та же, что в BoardModel.count_3bv, но на плоском массиве с границами.
+
+    :param rows: Количество строк.
+    :param cols: Количество столбцов.
+    :param mines: Координаты мин (x, y), начиная с 1.
+    :param limit: Если 3BV превысит limit, подсчет прекращается и возвращается первое значение больше limit.
+    """
+    stride = cols + 2
+    # 0 - ноль, 1 - цифра, 2 - мина, 3 - граница; seen отмечает посещенные ячейки
+    kind = bytearray([3]) * (stride * (rows + 2))
+    for i in range(1, rows + 1):
+        kind[i * stride + 1:i * stride + cols + 1] = bytes(cols)
+    offsets = (-stride - 1, -stride, -stride + 1, -1, 1, stride - 1, stride, stride + 1)
+    for x, y in mines:
+        cell = x * stride + y
+        for offset in offsets:
+            if not kind[cell + offset]:
+                kind[cell + offset] = 1
+        kind[cell] = 2
+
+    seen = bytearray(len(kind))
+    bbbv = 0
+    for start in range(stride + 1, stride * (rows + 1)):
+        if kind[start] or seen[start]:
+            continue
+        bbbv += 1
+        if limit is not None and bbbv > limit:
+            return bbbv
+        seen[start] = 1
+        stack = [start]
+        while stack:
+            cell = stack.pop()
+            for offset in offsets:
+                neighbor = cell + offset
+                if not seen[neighbor] and kind[neighbor] < 2:
+                    seen[neighbor] = 1
+                    if not kind[neighbor]:
+                        stack.append(neighbor)
+    for cell in range(stride + 1, stride * (rows + 1)):
+        if kind[cell] == 1 and not seen[cell]:
+            bbbv += 1
+            if limit is not None and bbbv > limit:
+                return bbbv
+    return bbbv
+
+
+def filter_chunk(task: tuple) -> tuple:
+    """
+    Генерирует доски с зернами пакета и оставляет те, у которых 3BV в диапазоне.
+
+    :param task: (rows, cols, mines, low, high, первое зерно, количество досок).
+    :return: (первое зерно, [(зерно, 3BV) принятых досок]).
+    """
+    rows, cols, mines, low, high, first_seed, count = task
+    cells = [(i, j) for i in range(1, rows + 1) for j in range(1, cols + 1)]
+    rng = Random()
+    accepted = []
+    for seed in range(first_seed, first_seed + count):
+        # Та же выборка, что в BoardModel.make_board: доска с этим зерном совпадет с BoardModel(seed=seed)
+        rng.seed(seed)
+        bbbv = count_3bv_from_mines(rows, cols, rng.sample(cells, mines), high)
+        if low <= bbbv <= high:
+            accepted.append((seed, bbbv))
+    return first_seed, accepted
+
+
+class BoardGenerator:
+    """
+    Подбирает доски с 3BV в заданном диапазоне. Кандидаты задаются зернами и проверяются пакетами
+    в пуле процессов, поэтому результат - список зерен: доску восстанавливает BoardModel с тем же зерном.
+    """
+
+    def __init__(self, rows: int, cols: int, mines: int, low: int, high: int) -> None:
+        """
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param mines: Количество мин.
+        :param low: Минимальный 3BV.
+        :param high: Максимальный 3BV.
+        """
+        self.rows, self.cols, self.mines = rows, cols, mines
+        self.low, self.high = low, high
+        self.generated = 0
+        self.matched = 0
+        self.elapsed = 0.0
+
+    def generate(self, count: int, seed: int = 0, workers: int = None, chunk: int = 2000) -> list[tuple[int, int]]:
+        """
+        Возвращает count досок (зерно, 3BV) в порядке зерен, начиная с seed.
+        Результат не зависит от количества процессов.
+
+        :param count: Сколько досок нужно.
+        :param seed: Первое проверяемое зерно.
+        :param workers: Количество процессов (по умолчанию по числу ядер).
+        :param chunk: Сколько кандидатов проверяет процесс за один пакет.
+        """
+        accepted = []
+        start = perf_counter()
+        workers = workers or os.cpu_count()
+        # Пакетов в работе в несколько раз больше, чем процессов; imap сохраняет порядок зерен
+        batch = workers * 4
+        with Pool(workers) as pool:
+            next_seed = seed
+            while len(accepted) < count:
+                tasks = [(self.rows, self.cols, self.mines, self.low, self.high, next_seed + k * chunk, chunk)
+                         for k in range(batch)]
+                next_seed += batch * chunk
+                # Отчет учитывает все проверенные пакеты, даже если нужное количество уже набрано
+                for _, boards in pool.imap(filter_chunk, tasks):
+                    self.generated += chunk
+                    self.matched += len(boards)
+                    accepted.extend(boards[:count - len(accepted)])
+        self.elapsed += perf_counter() - start
+        return accepted
+
+    def report(self, name: str) -> str:
+        """Строка отчета: сколько досок проверено и подошло в секунду"""
+        rate = self.generated / self.elapsed if self.elapsed else 0.0
+        share = self.matched / self.generated if self.generated else 0.0
+        return (f"{name:<10}{f'{self.low}-{self.high}':>10}{self.generated:>12}{self.matched:>10}{share:>10.2%}"
+                f"{rate:>14.0f}{rate * share:>14.1f}")
+
+
+def report_header() -> str:
+    return f"{'Board':<10}{'3BV':>10}{'Generated':>12}{'Accepted':>10}{'Rate':>10}{'Generated/s':>14}{'Accepted/s':>14}"
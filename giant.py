@@ -0,0 +1,133 @@
+import os
+from multiprocessing import Pool, shared_memory
+from time import perf_counter
+
+import numpy as np
+
+# Состояние процесса-исполнителя: доска в общей памяти, подключенная один раз на весь пул
+_worker_board = None
+
+
+def attach_board(name: str, shape: tuple) -> None:
+    """Подключает процесс-исполнитель к доске в общей памяти"""
+    global _worker_board
+    memory = shared_memory.SharedMemory(name=name)
+    _worker_board = memory, np.ndarray(shape, dtype=np.int8, buffer=memory.buf)
+
+
+def fill_stripe(task: tuple) -> int:
+    """
+    Расставляет мины полосы и считает цифры по минам этой же полосы.
+    Полосы пишут в непересекающиеся строки доски, поэтому исполнителям не нужны блокировки.
+
+    :param task: (номер полосы, первая строка, строка после последней, количество мин, зерно доски).
+    :return: Номер полосы.
+    """
+    index, first, last, count, seed = task
+    board = _worker_board[1]
+    cols = board.shape[1] - 2
+    height = last - first
+    rng = np.random.default_rng([seed, index])
+    mines = np.zeros((height + 2, cols + 2), dtype=bool)
+    cells = rng.choice(height * cols, size=count, replace=False)
+    mines[1 + cells // cols, 1 + cells % cols] = True
+
+    counts = np.zeros((height, cols), dtype=np.int8)
+    for di in (-1, 0, 1):
+        for dj in (-1, 0, 1):
+            if di or dj:
+                counts += mines[1 + di:height + 1 + di, 1 + dj:cols + 1 + dj]
+    # Как в generate_board: мина - 9 плюс мины вокруг
+    board[first:last, 1:cols + 1] = counts + 9 * mines[1:-1, 1:-1]
+    return index
+
+
+def stitch_seams(board: np.ndarray, seams: list) -> None:
+    """
+    Добавляет цифрам на стыках полос мины из соседней полосы, которых исполнители не видели.
+
+    :param board: Доска с границами, заполненная fill_stripe.
+    :param seams: Первые строки всех полос, кроме первой.
+    """
+    cols = board.shape[1] - 2
+    for row in seams:
+        above, below = board[row - 1] > 8, board[row] > 8
+        # Считаем вклад до изменения строк, чтобы не спутать цифру 9 и больше с миной
+        into_above = below[:-2].astype(np.int8) + below[1:-1] + below[2:]
+        into_below = above[:-2].astype(np.int8) + above[1:-1] + above[2:]
+        board[row - 1, 1:cols + 1] += into_above
+        board[row, 1:cols + 1] += into_below
+
+
+class StripedGenerator:
+    """
+    Генерация очень больших досок полосами по stripe_rows строк в пуле процессов.
+
+    Доска лежит в multiprocessing.shared_memory, каждый процесс заполняет свои строки на месте.
+    Количество мин в каждой полосе выбирается одним многомерным гипергеометрическим распределением
+    из зерна доски, поэтому мины распределены по доске равномерно, как при выборке из всех ячеек,
+    а мины внутри полосы выбираются из зерна (зерно доски, номер полосы). Высота полосы не зависит
+    от количества процессов, поэтому доска для зерна одна и та же при любом их количестве.
+    Цифры на стыках полос досчитываются последним проходом по строкам стыков.
+    """
+
+    def __init__(self, rows: int, cols: int, num_mines: int, stripe_rows: int = 256) -> None:
+        """
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param num_mines: Количество мин.
+        :param stripe_rows: Высота полосы в строках.
+        """
+        self.rows, self.cols, self.num_mines = rows, cols, num_mines
+        self.stripe_rows = stripe_rows
+        self.elapsed = 0.0
+
+    def stripes(self, seed: int) -> list[tuple]:
+        """Задачи полос: (номер, первая строка, строка после последней, мины, зерно), строки с границами"""
+        bounds = list(range(1, self.rows + 1, self.stripe_rows)) + [self.rows + 1]
+        sizes = [(last - first) * self.cols for first, last in zip(bounds, bounds[1:])]
+        counts = np.random.default_rng(seed).multivariate_hypergeometric(sizes, self.num_mines)
+        return [(index, first, last, int(count), seed)
+                for index, (first, last, count) in enumerate(zip(bounds, bounds[1:], counts))]
+
+    def generate(self, seed: int, workers: int = None) -> np.ndarray:
+        """
+        Возвращает доску (rows + 2, cols + 2) int8 с границами из нулей: цифры 0-8, мины - 9 и больше.
+
+        :param seed: Зерно доски.
+        :param workers: Количество процессов (по умолчанию по числу ядер).
+        """
+        start = perf_counter()
+        shape = (self.rows + 2, self.cols + 2)
+        tasks = self.stripes(seed)
+        memory = shared_memory.SharedMemory(create=True, size=shape[0] * shape[1])
+        try:
+            board = np.ndarray(shape, dtype=np.int8, buffer=memory.buf)
+            board.fill(0)
+            workers = min(workers or os.cpu_count(), len(tasks))
+            with Pool(workers, initializer=attach_board, initargs=(memory.name, shape)) as pool:
+                for _ in pool.imap_unordered(fill_stripe, tasks):
+                    pass
+            stitch_seams(board, [first for _, first, _, _, _ in tasks[1:]])
+            result = board.copy()
+            del board
+        finally:
+            memory.close()
+            memory.unlink()
+        self.elapsed += perf_counter() - start
+        return result
+
+
+def generate_striped(rows: int, cols: int, num_mines: int, seed: int, workers: int = None) -> tuple[list, set]:
+    """
+    Генерирует большую доску полосами и возвращает ее в формате generate_board: (доска, множество мин).
+
+    :param rows: Количество строк.
+    :param cols: Количество столбцов.
+    :param num_mines: Количество мин.
+    :param seed: Зерно доски.
+    :param workers: Количество процессов (по умолчанию по числу ядер).
+    """
+    board = StripedGenerator(rows, cols, num_mines).generate(seed, workers)
+    mines_cells = set(map(tuple, np.argwhere(board > 8).tolist()))
+    return board.tolist(), mines_cells
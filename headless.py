@@ -0,0 +1,274 @@
+from collections import Counter
+from time import perf_counter
+
+from changes import ChangeList
+from model import BoardModel
+from solver import STRATEGIES
+
+
+class HeadlessGame:
+    """
+    Партия без окна: применяет к BoardModel те же правила кликов, что и контроллер.
+    """
+
+    def __init__(self, rows: int, cols: int, num_mines: int, seed: int = None, topology: str = "square") -> None:
+        """
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param num_mines: Количество мин.
+        :param seed: Зерно генератора досок.
+        :param topology: Соседство ячеек из topology.TOPOLOGIES.
+        """
+        self.model = BoardModel(rows, cols, num_mines, seed, topology)
+        self.moves = 0
+        self.started = None
+
+    def new_game(self, seed: int = None) -> None:
+        """
+        Начинает новую партию, как кнопка New Game.
+
+        :param seed: Если передан, доска генерируется из этого зерна.
+        """
+        self.model.block_game_field = False
+        self.model.reload_board(seed=seed)
+        self.moves = 0
+        self.started = None
+
+    def log_move(self, kind: str, x: int = 0, y: int = 0) -> None:
+        """Записывает ход в журнал модели, время отсчитывается от первого хода, как на таймере окна"""
+        now = perf_counter()
+        if self.started is None:
+            self.started = now
+        self.model.log_move(kind, x, y, now - self.started)
+
+    def reveal(self, x: int, y: int) -> tuple[str, ChangeList]:
+        """
+        Левый клик по ячейке (x, y). Возвращает статус ("play", "win", "lose")
+        и список изменений с открытыми ячейками.
+        """
+        model = self.model
+        if model.block_game_field or (x, y) in model.marked_cells:
+            return "play", ChangeList()
+        self.moves += 1
+        self.log_move("left", x, y)
+        if not model.get_game_status():
+            model.game_over = False
+            model.swap_if_bomb(x, y)
+
+        if (x, y) in model.uncover_cells and model.board[x][y]:
+            # Клик по цифре, открываем соседей, если мины вокруг помечены верно
+            response = model.compare_marked_bombs_with_real_ones(x, y)
+            if response == 'lose':
+                return self.finish("lose"), model.take_changes()
+            if response is True:
+                model.bfs(x, y, chord=True)
+        elif model.bfs(x, y) and model.check_lose(x, y):
+            return self.finish("lose"), model.take_changes()
+
+        if model.check_win():
+            return self.finish("win"), model.take_changes()
+        return "play", model.take_changes()
+
+    def toggle_flag(self, x: int, y: int) -> bool:
+        """
+        Правый клик по ячейке (x, y). Возвращает True, если метка поставлена или снята.
+        """
+        model = self.model
+        if not model.get_game_status() or (x, y) in model.uncover_cells:
+            return False
+        self.moves += 1
+        self.log_move("right", x, y)
+        model.toggle_mark(x, y)
+        model.take_changes()
+        return True
+
+    def undo(self) -> bool:
+        """Отменяет последний ход. Возвращает False, если отменять нечего"""
+        undone = self.model.undo() is not None
+        self.model.take_changes()
+        if undone:
+            self.log_move("undo")
+        return undone
+
+    def redo(self) -> tuple[str, ChangeList]:
+        """
+        Повторяет отмененный ход. Возвращает статус и список изменений, как reveal.
+        """
+        model = self.model
+        move = model.redo()
+        changes = model.take_changes()
+        if move is not None:
+            self.log_move("redo")
+        if move is None or move[0] == "flag":
+            return "play", changes
+        if move[4]:
+            return self.finish("lose"), changes
+        if model.check_win():
+            return self.finish("win"), changes
+        return "play", changes
+
+    def finish(self, status: str) -> str:
+        """Завершает партию, как это делает контроллер при победе или поражении"""
+        self.model.game_over = True
+        self.model.block_game_field = True
+        return status
+
+
+class BatchStats:
+    """Статистика серии партий, может объединяться со статистикой других серий"""
+
+    def __init__(self) -> None:
+        self.games = 0
+        self.wins = 0
+        self.moves = 0
+        self.elapsed = 0.0
+        self.bfs_sizes = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def add_game(self, won: bool, moves: int) -> None:
+        """Учитывает завершенную партию"""
+        self.games += 1
+        self.wins += won
+        self.moves += moves
+
+    def merge(self, other: "BatchStats") -> None:
+        """Добавляет статистику другой серии"""
+        self.games += other.games
+        self.wins += other.wins
+        self.moves += other.moves
+        self.elapsed += other.elapsed
+        self.bfs_sizes.update(other.bfs_sizes)
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+
+    def add_cache_stats(self, strategy, hits: int = 0, misses: int = 0) -> None:
+        """
+        Добавляет счетчики кэша стратегии, накопленные после отметки (hits, misses).
+        У стратегий без кэша счетчики остаются нулевыми.
+        """
+        self.cache_hits += getattr(strategy, "cache_hits", 0) - hits
+        self.cache_misses += getattr(strategy, "cache_misses", 0) - misses
+
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+    def games_per_second(self) -> float:
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def time_per_move(self) -> float:
+        """Среднее время одного хода в секундах"""
+        return self.elapsed / self.moves if self.moves else 0.0
+
+    def cache_hit_rate(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def average_clearing(self) -> float:
+        """Среднее количество ячеек, открытых одним вызовом bfs"""
+        calls = sum(self.bfs_sizes.values())
+        return sum(size * count for size, count in self.bfs_sizes.items()) / calls if calls else 0.0
+
+    def bfs_histogram(self) -> list[tuple[str, int]]:
+        """Распределение ячеек на вызов bfs по степеням двойки: [("1", n), ("2-3", n), ("4-7", n), ...]"""
+        buckets = Counter()
+        for size, count in self.bfs_sizes.items():
+            buckets[size.bit_length()] += count
+        histogram = []
+        for bits in sorted(buckets):
+            low, high = (1 << bits) >> 1, (1 << bits) - 1
+            histogram.append((str(low) if low >= high else f"{low}-{high}", buckets[bits]))
+        return histogram
+
+    def to_json(self) -> dict:
+        return {
+            "games": self.games,
+            "wins": self.wins,
+            "moves": self.moves,
+            "elapsed": self.elapsed,
+            "bfs_sizes": {str(size): count for size, count in self.bfs_sizes.items()},
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "BatchStats":
+        stats = cls()
+        stats.games, stats.wins, stats.moves = data["games"], data["wins"], data["moves"]
+        stats.elapsed = data["elapsed"]
+        stats.bfs_sizes = Counter({int(size): count for size, count in data["bfs_sizes"].items()})
+        stats.cache_hits = data.get("cache_hits", 0)
+        stats.cache_misses = data.get("cache_misses", 0)
+        return stats
+
+
+def play_game(game: HeadlessGame, strategy, stats: BatchStats, seed: int = None) -> bool:
+    """
+    Играет одну партию стратегией до победы или поражения. Возвращает True при победе.
+
+    :param game: Партия, доска для которой будет сгенерирована заново.
+    :param strategy: Стратегия с методами reset, next_move и observe.
+    :param stats: Статистика, в которую добавляются размеры просек.
+    :param seed: Зерно доски и ходов стратегии.
+    """
+    game.new_game(seed)
+    strategy.reset(game, seed)
+    status = "play"
+    while status == "play":
+        move = strategy.next_move()
+        if move is None:
+            break
+        kind, x, y = move
+        if kind == "flag":
+            game.toggle_flag(x, y)
+            strategy.observe(kind, x, y, ChangeList())
+            continue
+        status, cells = game.reveal(x, y)
+        if cells:
+            stats.bfs_sizes[len(cells)] += 1
+        strategy.observe(kind, x, y, cells)
+    won = status == "win"
+    stats.add_game(won, game.moves)
+    return won
+
+
+def run_batch(games: int, rows: int, cols: int, num_mines: int, strategy: str, seed: int = 0,
+              topology: str = "square") -> BatchStats:
+    """
+    Играет серию партий на одном размере доски. Партия с номером i использует зерно seed + i.
+
+    :param games: Количество партий.
+    :param rows: Количество строк.
+    :param cols: Количество столбцов.
+    :param num_mines: Количество мин.
+    :param strategy: Имя стратегии из STRATEGIES.
+    :param seed: Зерно первой партии.
+    :param topology: Соседство ячеек из topology.TOPOLOGIES.
+    """
+    stats = BatchStats()
+    game = HeadlessGame(rows, cols, num_mines, seed, topology)
+    player = STRATEGIES[strategy]()
+    start = perf_counter()
+    for index in range(games):
+        play_game(game, player, stats, seed + index)
+    stats.elapsed = perf_counter() - start
+    stats.add_cache_stats(player)
+    return stats
+
+
+def format_report(stats: BatchStats, title: str) -> str:
+    """Форматирует статистику серии для вывода в консоль"""
+    lines = [
+        title,
+        f"Games: {stats.games}",
+        f"Games per second: {stats.games_per_second():.1f}",
+        f"Win rate: {stats.win_rate():.2%}",
+        f"Average clearing size: {stats.average_clearing():.2f} cells",
+        f"Time per move: {stats.time_per_move() * 1e6:.1f} us",
+        f"Solver cache hit rate: {stats.cache_hit_rate():.2%}",
+        "Cells per bfs call:",
+    ]
+    calls = sum(stats.bfs_sizes.values()) or 1
+    for label, count in stats.bfs_histogram():
+        lines.append(f"  {label:>11} {count:>10} {count / calls:7.2%}")
+    return "\n".join(lines)
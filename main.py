@@ -1,10 +1,331 @@
-from controller import MinesweeperController
+import argparse
+from random import randrange
 
 
-def main():
-    controller = MinesweeperController()
+def parse_args(argv: list = None) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки. Без подкоманды запускается окно игры.
+    """
+    parser = argparse.ArgumentParser(description="Minesweeper")
+    parser.add_argument("--seed", type=int, help="seed for board generation")
+    parser.add_argument("--record", metavar="PATH", help="record clicks into a script for the profile mode")
+    parser.add_argument("--submissions", metavar="PATH", help="append won games to this file for the verify mode")
+    parser.add_argument("--metrics", metavar="PATH", help="dump runtime metrics in Prometheus text format to this file")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve runtime metrics on http://127.0.0.1:PORT/metrics")
+    commands = parser.add_subparsers(dest="command")
+
+    profile = commands.add_parser("profile", help="replay a click script under cProfile or tracemalloc")
+    profile.add_argument("--script", metavar="PATH", help="recorded click script (generated when omitted)")
+    profile.add_argument("--difficulty", default="Hard", choices=["Easy", "Medium", "Hard"])
+    profile.add_argument("--games", type=int, default=20, help="games in a generated script")
+    profile.add_argument("--clicks", type=int, default=30, help="clicks per game in a generated script")
+    profile.add_argument("--profiler", default="both", choices=["cprofile", "tracemalloc", "both"])
+    profile.add_argument("--output", default="profile_output", help="directory for stats files")
+    profile.add_argument("--top", type=int, default=40, help="rows in text reports")
+
+    batch = commands.add_parser("batch", help="play games without a window and report throughput")
+    add_board_arguments(batch)
+    batch.add_argument("--games", type=int, default=1000)
+    batch.add_argument("--strategy", default="solver", choices=["random", "solver"])
+    batch.add_argument("--json", metavar="PATH", help="also write the stats as JSON")
+    batch.add_argument("--engine", default="model", choices=["model", "vector"],
+                       help="vector plays random clicks on stacked NumPy boards")
+    batch.add_argument("--boards", type=int, default=1024, help="boards stepped at once by the vector engine")
+    batch.add_argument("--topology", default="square", choices=["square", "torus", "hex"],
+                       help="cell adjacency of the model engine")
+
+    tournament = commands.add_parser("tournament", help="play seeded games across a process pool")
+    tournament.add_argument("--difficulties", nargs="+", default=["Easy", "Medium", "Hard"],
+                            choices=["Easy", "Medium", "Hard"])
+    tournament.add_argument("--games", type=int, default=100000, help="games per difficulty")
+    tournament.add_argument("--strategy", default="solver", choices=["random", "solver"])
+    tournament.add_argument("--chunk", type=int, default=500, help="games handed to a worker at once")
+    tournament.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    tournament.add_argument("--checkpoint", metavar="PATH", help="save progress here and resume from it")
+
+    generate = commands.add_parser("generate", help="find board seeds whose 3BV falls in a range")
+    generate.add_argument("--difficulties", nargs="+", default=["Easy", "Medium", "Hard"],
+                          choices=["Easy", "Medium", "Hard"])
+    generate.add_argument("--min-3bv", type=int, help="lower 3BV bound (default: per-difficulty target)")
+    generate.add_argument("--max-3bv", type=int, help="upper 3BV bound (default: per-difficulty target)")
+    generate.add_argument("--count", type=int, default=100, help="boards per difficulty")
+    generate.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    generate.add_argument("--output", metavar="PATH", help="write accepted seeds as JSON")
+
+    patterns = commands.add_parser("patterns", help="rebuild the solver's table of local patterns")
+    patterns.add_argument("--difficulties", nargs="+", default=["Easy", "Medium", "Hard"],
+                          choices=["Easy", "Medium", "Hard"])
+    patterns.add_argument("--games", type=int, default=3000, help="solver games per difficulty")
+    patterns.add_argument("--min-count", type=int, default=2, help="keep patterns seen at least this often")
+    patterns.add_argument("--output", metavar="PATH", help="table file (default: patterns.bin next to the game)")
+
+    verify = commands.add_parser("verify", help="replay leaderboard submissions and check their wins and times")
+    verify.add_argument("submissions", metavar="PATH", help="JSON lines file written with --submissions")
+    verify.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    verify.add_argument("--tolerance", type=float, default=0.5, help="seconds allowed between claimed and replayed time")
+    verify.add_argument("--output", metavar="PATH", help="write a verdict per submission as JSON lines")
+
+    conformance = commands.add_parser("conformance", help="check an engine backend against the model rules")
+    add_board_arguments(conformance)
+    conformance.add_argument("--backend", default="vector", choices=["vector"])
+    conformance.add_argument("--games", type=int, default=500)
+
+    giant = commands.add_parser("giant", help="time striped generation of a very large board")
+    giant.add_argument("--size", type=int, nargs=3, default=[5000, 5000, 4000000], metavar=("ROWS", "COLS", "MINES"))
+    giant.add_argument("--workers", type=int, nargs="+", help="worker counts to compare (default: all cores)")
+    giant.add_argument("--stripe-rows", type=int, default=256, help="rows per stripe")
+
+    serve = commands.add_parser("serve", help="host many headless games over a JSON-lines TCP protocol")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--max-sessions", type=int, default=10000)
+    serve.add_argument("--idle-timeout", type=float, default=300.0, help="seconds before an idle game is dropped")
+
+    loadtest = commands.add_parser("loadtest", help="load the game server and report latency percentiles")
+    add_board_arguments(loadtest)
+    loadtest.add_argument("--host", default="127.0.0.1")
+    loadtest.add_argument("--port", type=int, default=8765)
+    loadtest.add_argument("--clients", type=int, default=100, help="concurrent connections")
+    loadtest.add_argument("--duration", type=float, default=10.0, help="seconds")
+    return parser.parse_args(argv)
+
+
+def add_board_arguments(parser: argparse.ArgumentParser) -> None:
+    """Добавляет выбор доски: уровень сложности или произвольный размер"""
+    parser.add_argument("--difficulty", default="Hard", choices=["Easy", "Medium", "Hard"])
+    parser.add_argument("--size", type=int, nargs=3, metavar=("ROWS", "COLS", "MINES"),
+                        help="custom board, overrides --difficulty")
+
+
+def board_size(args: argparse.Namespace) -> tuple[int, int, int]:
+    """Возвращает (rows, cols, mines) по аргументам командной строки"""
+    from model import MinesweeperModel
+
+    rows, cols, mines = args.size or MinesweeperModel.mapp[args.difficulty]
+    if not (0 < mines < rows * cols):
+        raise SystemExit(f"Board {rows}x{cols} can't hold {mines} mines")
+    return rows, cols, mines
+
+
+def run_gui(args: argparse.Namespace) -> None:
+    """Запускает окно игры, при необходимости с записью кликов"""
+    from controller import MinesweeperController
+    from profiling import ClickRecorder
+
+    seed = args.seed
+    if args.record and seed is None:
+        # Без зерна записанный скрипт нельзя воспроизвести на тех же досках
+        seed = randrange(2 ** 32)
+    controller = MinesweeperController(seed, args.submissions, args.metrics, args.metrics_port)
+    if args.record:
+        controller.recorder = ClickRecorder(args.record, controller.get_current_difficulty(), seed)
     controller.run()
 
 
+def run_profile(args: argparse.Namespace) -> None:
+    """Проигрывает скрипт кликов под профилировщиком и печатает пути к отчетам"""
+    from model import MinesweeperModel
+    from profiling import ProfileSession, generate_click_script, load_click_script
+
+    if args.script:
+        script = load_click_script(args.script)
+    else:
+        seed = randrange(2 ** 32) if args.seed is None else args.seed
+        script = generate_click_script(args.difficulty, args.games, args.clicks, seed, MinesweeperModel.mapp)
+
+    session = ProfileSession(script, args.output, args.top)
+    if args.profiler in ("cprofile", "both"):
+        print(f"cProfile stats: {session.run_cprofile()}")
+    if args.profiler in ("tracemalloc", "both"):
+        print(f"Allocation summary: {session.run_tracemalloc()}")
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    """Играет серию партий без окна и печатает отчет"""
+    import json
+    import headless
+
+    rows, cols, mines = board_size(args)
+    seed = 0 if args.seed is None else args.seed
+    if args.engine == "vector":
+        from batch_engine import run_vector_batch
+
+        if args.topology != "square":
+            raise SystemExit("The vector engine plays square boards only")
+        strategy = "random"
+        stats = run_vector_batch(args.games, rows, cols, mines, args.boards, seed)
+    else:
+        strategy = args.strategy
+        stats = headless.run_batch(args.games, rows, cols, mines, strategy, seed, args.topology)
+    title = (f"Board {rows}x{cols} {args.topology}, {mines} mines, engine {args.engine}, strategy {strategy}, "
+             f"seed {seed}")
+    print(headless.format_report(stats, title))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"rows": rows, "cols": cols, "mines": mines, "topology": args.topology, "engine": args.engine, "strategy": strategy,
+                       "seed": seed, **stats.to_json()}, file)
+
+
+def run_tournament(args: argparse.Namespace) -> None:
+    """Разыгрывает турнир пулом процессов, продолжая с checkpoint, если он есть"""
+    from model import MinesweeperModel
+    from tournament import Tournament
+
+    config = {
+        "boards": {difficulty: list(MinesweeperModel.mapp[difficulty]) for difficulty in args.difficulties},
+        "strategy": args.strategy,
+        "games": args.games,
+        "seed": 0 if args.seed is None else args.seed,
+        "chunk": args.chunk,
+    }
+    tournament = Tournament(config, args.checkpoint)
+    if tournament.resume():
+        print(f"Resuming from {args.checkpoint}: {len(tournament.done)} chunks done")
+
+    def progress(played: int, total: int) -> None:
+        print(f"\r{played}/{total} games", end="", flush=True)
+
+    tournament.run(args.workers, progress)
+    print()
+    print(tournament.report())
+
+
+def run_generate(args: argparse.Namespace) -> None:
+    """Подбирает доски по 3BV для каждой сложности и печатает отчет о скорости"""
+    import json
+    from generator import TARGET_3BV, BoardGenerator, report_header
+    from model import MinesweeperModel
+
+    seed = 0 if args.seed is None else args.seed
+    boards = {}
+    lines = [report_header()]
+    for difficulty in args.difficulties:
+        rows, cols, mines = MinesweeperModel.mapp[difficulty]
+        low, high = TARGET_3BV[difficulty]
+        low = low if args.min_3bv is None else args.min_3bv
+        high = high if args.max_3bv is None else args.max_3bv
+        generator = BoardGenerator(rows, cols, mines, low, high)
+        accepted = generator.generate(args.count, seed, args.workers)
+        boards[difficulty] = [{"seed": board_seed, "3bv": bbbv} for board_seed, bbbv in accepted]
+        lines.append(generator.report(difficulty))
+    print("\n".join(lines))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(boards, file)
+
+
+def run_patterns(args: argparse.Namespace) -> None:
+    """Строит таблицу образцов по партиям решателя и сохраняет ее"""
+    from model import MinesweeperModel
+    from patterns import PATTERNS_PATH, collect_patterns
+
+    # Зерна по умолчанию не пересекаются с зернами batch и tournament, чтобы таблицу проверяли на других досках
+    seed = 10 ** 6 if args.seed is None else args.seed
+    boards = [MinesweeperModel.mapp[difficulty] for difficulty in args.difficulties]
+    table, seen = collect_patterns(boards, args.games, seed, args.min_count)
+    output = args.output or PATTERNS_PATH
+    table.save(output)
+    print(f"{len(seen)} patterns seen, {len(table.entries)} with deductions kept in {output}")
+
+
+def run_verify(args: argparse.Namespace) -> None:
+    """Проверяет заявки на рекорд пулом процессов и печатает отклоненные"""
+    import json
+    from verifier import ReplayVerifier
+
+    verifier = ReplayVerifier(args.tolerance)
+    results = verifier.verify_file(args.submissions, args.workers)
+    for line, accepted, reason in results:
+        if not accepted:
+            print(f"line {line}: {reason}")
+    print(verifier.report())
+    if args.output:
+        with open(args.output, "w") as file:
+            for line, accepted, reason in results:
+                file.write(json.dumps({"line": line, "accepted": accepted, "reason": reason}) + "\n")
+
+
+def run_conformance(args: argparse.Namespace) -> None:
+    """Сравнивает движок с моделью на одинаковых потоках действий и печатает отчет"""
+    from conformance import BACKENDS, ConformanceRun, ModelBackend
+
+    rows, cols, mines = board_size(args)
+    seed = 0 if args.seed is None else args.seed
+    run = ConformanceRun(BACKENDS[args.backend](rows, cols, mines), ModelBackend(rows, cols, mines), rows, cols)
+    passed = run.run(args.games, seed)
+    print(run.report())
+    if not passed:
+        raise SystemExit(1)
+
+
+def run_giant(args: argparse.Namespace) -> None:
+    """Генерирует большую доску полосами с разным количеством процессов и печатает время"""
+    import os
+    from giant import StripedGenerator
+
+    rows, cols, mines = args.size
+    if not (0 < mines < rows * cols):
+        raise SystemExit(f"Board {rows}x{cols} can't hold {mines} mines")
+    seed = 0 if args.seed is None else args.seed
+    print(f"Board {rows}x{cols}, {mines} mines, stripes of {args.stripe_rows} rows, seed {seed}")
+    print(f"{'Workers':>8}{'Seconds':>10}{'Mcells/s':>10}")
+    for workers in args.workers or [os.cpu_count()]:
+        generator = StripedGenerator(rows, cols, mines, args.stripe_rows)
+        generator.generate(seed, workers)
+        rate = rows * cols / generator.elapsed / 1e6
+        print(f"{workers:>8}{generator.elapsed:>10.2f}{rate:>10.1f}")
+
+
+def run_server(args: argparse.Namespace) -> None:
+    """Запускает сервер партий до прерывания"""
+    import asyncio
+    from server import GameServer
+
+    server = GameServer(args.host, args.port, args.max_sessions, args.idle_timeout)
+    print(f"Serving on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_load_test(args: argparse.Namespace) -> None:
+    """Нагружает сервер партий и печатает отчет"""
+    import asyncio
+    from server import LoadTest
+
+    test = LoadTest(args.host, args.port, args.clients, args.duration, board_size(args),
+                    0 if args.seed is None else args.seed)
+    asyncio.run(test.run())
+    print(test.report())
+
+
+def main(argv: list = None):
+    args = parse_args(argv)
+    if args.command == "profile":
+        run_profile(args)
+    elif args.command == "batch":
+        run_batch(args)
+    elif args.command == "tournament":
+        run_tournament(args)
+    elif args.command == "generate":
+        run_generate(args)
+    elif args.command == "patterns":
+        run_patterns(args)
+    elif args.command == "verify":
+        run_verify(args)
+    elif args.command == "conformance":
+        run_conformance(args)
+    elif args.command == "giant":
+        run_giant(args)
+    elif args.command == "serve":
+        run_server(args)
+    elif args.command == "loadtest":
+        run_load_test(args)
+    else:
+        run_gui(args)
+
+
 if __name__ == "__main__":
     main()
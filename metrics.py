@@ -0,0 +1,212 @@
+import os
+import sys
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+CELLS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Gauge:
+    """Текущее значение: задается set или читается функцией в момент выгрузки"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, function=None) -> None:
+        """
+        :param function: Функция без аргументов, которая возвращает значение или None, если его нет.
+        """
+        self.name, self.help = name, help_text
+        self.function = function
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def get(self) -> float:
+        return self.value if self.function is None else self.function()
+
+    def samples(self) -> list[tuple]:
+        value = self.get()
+        return [] if value is None else [(self.name, "", value)]
+
+    def summary(self) -> str:
+        value = self.get()
+        return "-" if value is None else f"{value:,}"
+
+
+class Counter(Gauge):
+    """
+    Счетчик, который только растет. Значение увеличивает inc или, если счет ведет чужой код
+    (например, класс виджета), его читает функция.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Histogram:
+    """
+    Распределение наблюдений по корзинам с верхними границами buckets, плюс сумма и количество.
+    Наблюдение стоит одного двоичного поиска, значения не хранятся.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = SECONDS_BUCKETS) -> None:
+        self.name, self.help = name, help_text
+        self.buckets = buckets
+        # Последняя корзина - значения больше всех границ (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self) -> list[tuple]:
+        samples = []
+        total = 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            total += count
+            samples.append((f"{self.name}_bucket", f'{{le="{bound}"}}', total))
+        samples.append((f"{self.name}_sum", "", self.sum))
+        samples.append((f"{self.name}_count", "", self.count))
+        return samples
+
+    def summary(self) -> str:
+        if not self.count:
+            return "-"
+        return f"avg {self.sum / self.count:.4g} over {self.count}"
+
+
+class MetricsRegistry:
+    """
+    Метрики работающей игры: счетчики, гистограммы и значения. Выгружаются в текстовом формате Prometheus
+    в файл или по HTTP на localhost, а короткая сводка показывается в окне отладки.
+    """
+
+    def __init__(self, prefix: str = "minesweeper") -> None:
+        """
+        :param prefix: Приставка имен метрик.
+        """
+        self.prefix = prefix
+        self.metrics = {}
+        self.server = None
+
+    def add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, function=None) -> Counter:
+        return self.add(Counter(f"{self.prefix}_{name}", help_text, function))
+
+    def gauge(self, name: str, help_text: str, function=None) -> Gauge:
+        return self.add(Gauge(f"{self.prefix}_{name}", help_text, function))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = SECONDS_BUCKETS) -> Histogram:
+        return self.add(Histogram(f"{self.prefix}_{name}", help_text, buckets))
+
+    def to_prometheus(self) -> str:
+        """Все метрики в текстовом формате Prometheus 0.0.4"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {value!r}" for name, labels, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """Строка на метрику, для окна отладки"""
+        start = len(self.prefix) + 1
+        return "\n".join(f"{name[start:]}: {metric.summary()}" for name, metric in self.metrics.items())
+
+    def write(self, path: str) -> None:
+        """Записывает выгрузку в файл целиком: читатель файла не увидит его наполовину записанным"""
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(self.to_prometheus())
+        os.replace(temporary, path)
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """
+        Отдает выгрузку по GET /metrics из фонового потока. Возвращает порт (0 - выбрать свободный).
+        """
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def shutdown(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class Timed:
+    """Контекстный менеджер: наблюдает в гистограмму время блока в секундах"""
+
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self) -> "Timed":
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(perf_counter() - self.start)
+
+
+def max_rss_bytes() -> int:
+    """Наибольший размер процесса в памяти в байтах или None, если платформа его не сообщает"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux сообщает килобайты, macOS - байты
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class GameMetrics(MetricsRegistry):
+    """Метрики окна игры"""
+
+    def __init__(self, configures=None) -> None:
+        """
+        :param configures: Функция, которая возвращает количество вызовов configure у кнопок поля.
+        """
+        super().__init__()
+        self.games_started = self.counter("games_started_total", "Games started.")
+        self.games_won = self.counter("games_won_total", "Games won.")
+        self.bfs_cells = self.histogram("bfs_cells", "Cells opened by one bfs call.", CELLS_BUCKETS)
+        self.model_seconds = self.histogram("model_action_seconds", "Model time per player action.")
+        self.render_seconds = self.histogram("render_seconds", "Drawing time of the changes of one render.")
+        self.widget_configures = self.counter("widget_configures_total", "Configure calls on field buttons.",
+                                              configures)
+        self.records_save_seconds = self.histogram("records_save_seconds", "Time to save settings and records.")
+        self.max_resident_bytes = self.gauge("max_resident_bytes", "Peak resident memory of the process.",
+                                             max_rss_bytes)
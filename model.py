@@ -1,25 +1,79 @@
-from random import sample, randint
+from random import Random
+from collections import deque
 import json
 from Crypto.Cipher import AES
 from copy import deepcopy
 import os.path
 
+from changes import ChangeList, MINE, LOST_MINE, EXPLODED, WRONG_FLAG, FLAG, UNFLAG, COVER, LOCK
+from topology import Topology, get_topology
 
-class MinesweeperModel:
-    def __init__(self, controller):
-        """
-        Инициализирует экземпляр MinesweeperModel.
+MASK64 = (1 << 64) - 1
+RECORDS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scores")
+DIFFICULTIES = ("Easy", "Medium", "Hard")
+# Доски от этого количества ячеек генерируются полосами в пуле процессов (giant.py, нужен NumPy)
+STRIPED_CELLS = 4_000_000
 
-        :param controller: Контроллер игры.
+
+def zobrist(cell: int, code: int) -> int:
+    """
+    64-битный ключ Зобриста для ячейки с номером cell в состоянии code (цифра 0-8, мина или FLAG).
+    Ключи вычисляются перемешиванием splitmix64, а не хранятся таблицей: таблица для больших досок
+    заняла бы слишком много памяти, а ключи должны совпадать во всех процессах.
+    """
+    z = (cell * 16 + code + 1) * 0x9E3779B97F4A7C15 & MASK64
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EB & MASK64
+    return z ^ (z >> 31)
+
+
+def generate_board(rows: int, cols: int, num_mines: int, rng: Random, topology: Topology = None) -> tuple[list, set]:
+    """
+    Генерирует доску с границами из нулей по краям и множество координат мин.
+    Не обращается к состоянию модели, поэтому может выполняться в фоновом потоке со своим rng.
+
+    :param rows: Количество строк.
+    :param cols: Количество столбцов.
+    :param num_mines: Количество мин.
+    :param rng: Генератор случайных чисел.
+    :param topology: Соседство ячеек (по умолчанию квадратная доска).
+    """
+    if rows * cols >= STRIPED_CELLS and (topology is None or topology.name == "square"):
+        from giant import generate_striped
+
+        return generate_striped(rows, cols, num_mines, rng.getrandbits(63))
+    topology = topology or get_topology("square", rows, cols)
+    board = [[0] * (cols + 2) for _ in range(rows + 2)]
+    mines_cells = set(rng.sample([(i, j) for i in range(1, rows + 1) for j in range(1, cols + 1)], num_mines))
+
+    neighbors = topology.neighbors
+    for i, j in mines_cells:
+        board[i][j] += 9
+        for a, b in neighbors(i, j):
+            board[a][b] += 1
+    return board, mines_cells
+
+
+class BoardModel:
+    """
+    Правила игры и состояние доски, без контроллера и таблицы рекордов.
+    Используется моделью игры с окном и headless режимами.
+    """
+
+    def __init__(self, rows: int, cols: int, num_mines: int, seed: int = None, topology: str = "square"):
         """
-        self.controller = controller
-        self.encryptor = DataEncryptor(b'7yqZ7Fq^#3Cr3%nY')  # Длина должна быть 16 символов
-        self.scoreboard = ModelScoreboard(self.encryptor.load_records())
-        self.difficulty = self.scoreboard.get_last_difficulty()
-        # self.scoreboard.set_default()
+        Инициализирует доску.
 
-        self.mapp = {'Easy': (9, 9, 10), 'Medium': (16, 16, 40), 'Hard': (16, 30, 99)}
-        self.neighbors = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        :param num_mines: Количество мин.
+        :param seed: Зерно генератора случайных чисел, для воспроизводимых партий (по умолчанию случайное).
+        :param topology: Соседство ячеек: "square", "torus" или "hex" (см. topology.py).
+        """
+        self.rng = Random(seed)
+        self.topology_name = topology
+        self.topology = get_topology(topology, rows, cols)
+        self.neighbors = self.topology.neighbors
 
         self.mines_cells = set()
         self.uncover_cells = set()
@@ -27,20 +81,116 @@ class MinesweeperModel:
         self.game_over = True
         self.block_game_field = False
 
-        self.rows, self.cols, self.num_mines = self.mapp[self.difficulty]
+        # Счетчики соседей в матрицах того же размера, что и board (с границами):
+        # помеченных, помеченных верно (на минах) и закрытых
+        self.flag_counts = []
+        self.true_flag_counts = []
+        self.hidden_counts = []
+        # (топология, шаблон счетчиков закрытых соседей для нее)
+        self.hidden_template = None
+        # Граница: открытые цифры, у которых остались закрытые соседи без меток.
+        # dirty - ячейки границы, ограничения которых изменились с последнего take_dirty
+        self.frontier = set()
+        self.dirty = set()
+        # Хэш видимой позиции: XOR ключей Зобриста открытых ячеек и меток, обновляется с каждым ходом
+        self.position_hash = 0
+        self.history = MoveHistory()
+        # Перенос мины первого клика ((x, y), (dx, dy)), пока его не запишет в историю открытие
+        self.swapped = None
+        # Изменения ячеек с последнего take_changes, для отрисовки
+        self.changes = ChangeList()
+        # 3BV считается лениво, при первом запросе, чтобы не замедлять генерацию доски
+        self.bbbv = None
+        self.clicks = 0
+        # Зерно доски текущей партии и журнал ходов (мс игрового времени, ход, x, y) для проверки рекордов
+        self.game_seed = seed
+        self.move_log = []
+        # Журнал пуст или неполон у партии, продолженной из сохранения: такую партию проверить нельзя
+        self.move_log_complete = True
+
+        self.rows, self.cols, self.num_mines = rows, cols, num_mines
+        if seed is None:
+            self.game_seed = self.next_game_seed()
+            self.rng.seed(self.game_seed)
         self.board = self.make_board()
+        self.reset_counters()
         self.number_of_cells_needed_to_win = self.get_number_of_cells_needed_to_win()
 
-    def reload_board(self) -> None:
+    def reload_board(self, generated: tuple = None, seed: int = None) -> None:
         """
-        Генерирует новую доску и обнуляет параметры
+        Генерирует новую доску и обнуляет параметры.
+        Доска каждой партии строится из своего зерна, поэтому ее можно восстановить по game_seed.
+
+        :param generated: Доска и мины, уже созданные generate_board (например, в фоновом потоке).
+        :param seed: Зерно доски. Без generated по умолчанию берется следующее зерно из rng,
+            с generated - зерно, из которого generated построена.
         """
         self.uncover_cells = set()
         self.mines_cells = set()
         self.marked_cells = set()
         self.game_over = True
+        # Размер доски мог смениться вместе со сложностью
+        self.topology = get_topology(self.topology_name, self.rows, self.cols)
+        self.neighbors = self.topology.neighbors
         self.number_of_cells_needed_to_win = self.get_number_of_cells_needed_to_win()
-        self.board = self.make_board()
+        if generated is None:
+            if seed is None:
+                seed = self.next_game_seed()
+            self.rng.seed(seed)
+            self.board = self.make_board()
+        else:
+            self.board, self.mines_cells = generated
+        self.game_seed = seed
+        self.move_log = []
+        self.move_log_complete = True
+        self.reset_counters()
+        self.frontier = set()
+        self.dirty = set()
+        self.position_hash = 0
+        self.history.clear()
+        self.swapped = None
+        self.changes = ChangeList()
+        self.bbbv = None
+        self.clicks = 0
+
+    def next_game_seed(self) -> int:
+        """Зерно доски следующей партии из генератора модели"""
+        return self.rng.getrandbits(32)
+
+    def log_move(self, kind: str, x: int, y: int, at: float) -> None:
+        """
+        Записывает ход игрока в журнал партии.
+
+        :param kind: "left", "right", "undo" или "redo".
+        :param at: Игровое время хода в секундах, как на таймере.
+        """
+        self.move_log.append((round(at * 1000), kind, x, y))
+
+    def get_replay(self, time: float) -> dict:
+        """
+        Возвращает партию для проверки рекорда (см. verifier.py): размер доски, зерно, заявленное время и журнал ходов.
+        Если журнал партии неполон (move_log_complete), возвращает None.
+
+        :param time: Время партии в секундах.
+        """
+        if not self.move_log_complete:
+            return None
+        return {"rows": self.rows, "cols": self.cols, "mines": self.num_mines, "seed": self.game_seed,
+                "time": time, "moves": [list(move) for move in self.move_log]}
+
+    def reset_counters(self) -> None:
+        """
+        Обнуляет счетчики меток и заполняет счетчики закрытых соседей для новой доски.
+        Шаблон закрытых соседей строится один раз для размера доски и топологии.
+        """
+        height, width = self.rows + 2, self.cols + 2
+        topology, template = self.hidden_template or (None, None)
+        if topology is not self.topology:
+            template = self.topology.degrees()
+            self.hidden_template = self.topology, template
+        self.hidden_counts = [row[:] for row in template]
+        self.flag_counts = [[0] * width for _ in range(height)]
+        self.true_flag_counts = [[0] * width for _ in range(height)]
 
     def check_win(self) -> bool:
         """
@@ -48,32 +198,248 @@ class MinesweeperModel:
         """
         return self.number_of_cells_needed_to_win == len(self.uncover_cells)
 
-    def check_lose(self, coord_set: set) -> bool:
+    def check_lose(self, x: int, y: int) -> bool:
         """
-        Проверка условия поражения, принимает координаты кликнутой ячейки в виде {(x, y)}
+        Проверка условия поражения после клика по закрытой ячейке (x, y)
         Возвращает True, если по переданным координатам находится бомба, иначе False
         """
-        x, y = next(iter(coord_set))
-        return (x + 1, y + 1) in self.mines_cells
+        return (x, y) in self.mines_cells
 
-    def set_difficulty(self, difficulty: str) -> None:
-        """
-        Установка сложности игры. (Easy, Medium, Hard)
-        """
-        self.difficulty = difficulty
-        self.scoreboard.records["CurrentDifficulty"] = difficulty
-        self.rows, self.cols, self.num_mines = self.mapp[self.difficulty]
+    def cell_id(self, x: int, y: int) -> int:
+        """Номер ячейки (x, y) в списке изменений"""
+        return (x - 1) * self.cols + y - 1
+
+    def cell_coords(self, cell: int) -> tuple[int, int]:
+        """Координаты (x, y) ячейки по ее номеру в списке изменений"""
+        x, y = divmod(cell, self.cols)
+        return x + 1, y + 1
+
+    def take_changes(self) -> ChangeList:
+        """Возвращает накопленные изменения ячеек и начинает новый список"""
+        changes, self.changes = self.changes, ChangeList()
+        return changes
 
     def set_mark_bomb(self, status: bool, x: int, y: int) -> None:
         """
         Добавляет или удаляет координаты (x, y) в set с метками бомб игрока,
         при обходе в ширину эти координаты игнорируются.
         Status сигнализирует какое действие необходимо выполнить.
+        Обновляет счетчики помеченных соседей у соседних ячеек.
         """
         if status:
             self.marked_cells.add((x, y))
         else:
             self.marked_cells.remove((x, y))
+        self.changes.add(self.cell_id(x, y), FLAG if status else UNFLAG)
+        self.position_hash ^= zobrist(self.cell_id(x, y), FLAG)
+        delta = 1 if status else -1
+        is_mine = (x, y) in self.mines_cells
+        for i, j in self.neighbors(x, y):
+            self.flag_counts[i][j] += delta
+            if is_mine:
+                self.true_flag_counts[i][j] += delta
+            if (i, j) in self.uncover_cells:
+                self.touch(i, j)
+
+    def toggle_mark(self, x: int, y: int) -> bool:
+        """
+        Ставит или снимает метку на ячейке (x, y) ходом игрока, ход записывается в историю.
+        Возвращает новое состояние метки
+        """
+        status = (x, y) not in self.marked_cells
+        self.set_mark_bomb(status, x, y)
+        self.history.push(("flag", x, y, status))
+        return status
+
+    def uncover(self, cells) -> None:
+        """Открывает ячейки: добавляет их в множество открытых и уменьшает счетчики закрытых соседей"""
+        board, add, uncovered = self.board, self.changes.add, self.uncover_cells
+        hidden_counts, neighbors = self.hidden_counts, self.neighbors
+        for x, y in cells:
+            uncovered.add((x, y))
+            cell, code = self.cell_id(x, y), min(board[x][y], MINE)
+            add(cell, code)
+            self.position_hash ^= zobrist(cell, code)
+            for i, j in neighbors(x, y):
+                hidden_counts[i][j] -= 1
+                if (i, j) in uncovered:
+                    self.touch(i, j)
+            self.touch(x, y)
+
+    def cover(self, cells) -> None:
+        """Закрывает ячейки: убирает их из множества открытых и увеличивает счетчики закрытых соседей"""
+        for x, y in cells:
+            self.uncover_cells.remove((x, y))
+            self.changes.add(self.cell_id(x, y), COVER)
+            self.position_hash ^= zobrist(self.cell_id(x, y), min(self.board[x][y], MINE))
+            self.touch(x, y)
+            for i, j in self.neighbors(x, y):
+                self.hidden_counts[i][j] += 1
+                if (i, j) in self.uncover_cells:
+                    self.touch(i, j)
+
+    def touch(self, x: int, y: int) -> None:
+        """
+        Обновляет принадлежность ячейки (x, y) к границе после изменения ее соседей
+        и отмечает ее ограничение измененным.
+        """
+        if ((x, y) in self.uncover_cells and 0 < self.board[x][y] < 9
+                and self.hidden_counts[x][y] > self.flag_counts[x][y]):
+            self.frontier.add((x, y))
+            self.dirty.add((x, y))
+        else:
+            self.frontier.discard((x, y))
+            self.dirty.discard((x, y))
+
+    def constraint(self, x: int, y: int) -> tuple[int, int]:
+        """Ограничение ячейки границы: (сколько мин осталось найти среди соседей, сколько соседей неизвестно)"""
+        flags = self.flag_counts[x][y]
+        return self.board[x][y] - flags, self.hidden_counts[x][y] - flags
+
+    def take_dirty(self) -> set:
+        """Возвращает ячейки границы с изменившимися ограничениями и начинает новый набор"""
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def emit_state(self) -> None:
+        """Добавляет в изменения состояние каждой ячейки, чтобы отрисовщик перерисовал поле целиком"""
+        add = self.changes.add
+        for x in range(1, self.rows + 1):
+            for y in range(1, self.cols + 1):
+                cell = self.cell_id(x, y)
+                if (x, y) in self.uncover_cells:
+                    add(cell, min(self.board[x][y], MINE))
+                else:
+                    add(cell, COVER)
+                    if (x, y) in self.marked_cells:
+                        add(cell, FLAG)
+
+    def outward(self, x: int, y: int) -> list:
+        """Все ячейки доски в порядке удаления от (x, y), чтобы открытие расходилось от места клика"""
+        cells = [(i, j) for i in range(1, self.rows + 1) for j in range(1, self.cols + 1)]
+        cells.sort(key=lambda cell: max(abs(cell[0] - x), abs(cell[1] - y)))
+        return cells
+
+    def emit_win(self, x: int, y: int) -> None:
+        """Добавляет в изменения открытие всех оставшихся ячеек при победе, начиная от (x, y)"""
+        add = self.changes.add
+        for i, j in self.outward(x, y):
+            if (i, j) not in self.uncover_cells:
+                add(self.cell_id(i, j), min(self.board[i][j], MINE))
+
+    def emit_loss(self, x: int, y: int) -> None:
+        """
+        Добавляет в изменения итог поражения от клика по (x, y): мины, ошибочные метки и блокировку
+        остальных закрытых ячеек. Взорванными отмечается мина под кликом, а при chord - непомеченные мины вокруг.
+        """
+        if (x, y) in self.mines_cells:
+            exploded = {(x, y)}
+        else:
+            exploded = {(i, j) for i, j in self.neighbors(x, y)
+                        if (i, j) in self.mines_cells and (i, j) not in self.marked_cells}
+        add = self.changes.add
+        for i, j in self.outward(x, y):
+            cell = self.cell_id(i, j)
+            if (i, j) in exploded:
+                add(cell, EXPLODED)
+            elif (i, j) in self.mines_cells:
+                add(cell, LOST_MINE)
+            elif (i, j) in self.marked_cells:
+                add(cell, WRONG_FLAG)
+            elif (i, j) not in self.uncover_cells:
+                add(cell, LOCK)
+
+    def undo(self) -> tuple:
+        """
+        Отменяет последний ход и возвращает его или None, если отменять нечего.
+        Отмена открытия стоит столько же, сколько само открытие: убираются только записанные ячейки.
+        Отмена проигрышного хода возвращает партию в игру, выигранная партия не отменяется.
+        Отмена первого клика возвращает перенесенную им мину на место, доска становится исходной.
+        """
+        if self.check_win():
+            return None
+        move = self.history.undo()
+        if move is None:
+            return None
+        if move[0] == "flag":
+            _, x, y, status = move
+            self.set_mark_bomb(not status, x, y)
+        else:
+            self.cover(move[3])
+            if move[5]:
+                self.move_mine(*reversed(move[5]))
+        if self.block_game_field:
+            # После поражения поле перерисовано целиком, поэтому отрисовщику отдается все состояние
+            self.emit_state()
+        self.block_game_field = False
+        # Если открытых ячеек не осталось, партия снова ждет первого клика
+        self.game_over = not self.uncover_cells
+        return move
+
+    def redo(self) -> tuple:
+        """
+        Повторяет отмененный ход и возвращает его или None, если повторять нечего.
+        Победу или поражение после повтора определяет вызывающий код, как после клика.
+        """
+        move = self.history.redo()
+        if move is None:
+            return None
+        if move[0] == "flag":
+            _, x, y, status = move
+            self.set_mark_bomb(status, x, y)
+        else:
+            if move[5]:
+                self.move_mine(*move[5])
+            self.uncover(move[3])
+            self.game_over = False
+        return move
+
+    def get_3bv(self) -> int:
+        """
+        Возвращает 3BV доски - минимальное количество левых кликов для победы без меток.
+        Считается один раз для доски за линейное время и кэшируется до ее изменения.
+        """
+        if self.bbbv is None:
+            self.bbbv = self.count_3bv()
+        return self.bbbv
+
+    def count_3bv(self) -> int:
+        """
+        Разметка областей нулей: каждая область вместе с цифрами на ее границе открывается одним кликом,
+        каждая цифра вне таких областей - отдельным. Каждая ячейка посещается не больше одного раза.
+        """
+        board, rows, cols, neighbors = self.board, self.rows, self.cols, self.neighbors
+        seen = [[False] * (cols + 2) for _ in range(rows + 2)]
+        bbbv = 0
+        for i in range(1, rows + 1):
+            for j in range(1, cols + 1):
+                if board[i][j] or seen[i][j]:
+                    continue
+                bbbv += 1
+                seen[i][j] = True
+                stack = [(i, j)]
+                while stack:
+                    x, y = stack.pop()
+                    for a, b in neighbors(x, y):
+                        if not seen[a][b]:
+                            seen[a][b] = True
+                            if not board[a][b]:
+                                stack.append((a, b))
+        for i in range(1, rows + 1):
+            row, seen_row = board[i], seen[i]
+            for j in range(1, cols + 1):
+                if not seen_row[j] and row[j] < 9:
+                    bbbv += 1
+        return bbbv
+
+    def get_game_stats(self, seconds: float) -> list:
+        """
+        Возвращает показатели партии для таблицы рекордов: [3BV, 3BV/s, эффективность кликов].
+
+        :param seconds: Время партии в секундах.
+        """
+        bbbv = self.get_3bv()
+        return [bbbv, round(bbbv / max(seconds, 1.0), 2), round(bbbv / max(self.clicks, 1), 2)]
 
     def get_number_of_cells_needed_to_win(self) -> int:
         """
@@ -91,23 +457,13 @@ class MinesweeperModel:
         """
         Генерирует игровую доску с границами из нулей по краям
         """
-        board = [[0] * (self.cols + 2) for _ in range(self.rows + 2)]
-        self.mines_cells = set(sample([(i, j) for i in range(1, self.rows + 1)
-                                       for j in range(1, self.cols + 1)], self.num_mines))
-
-        for i, j in self.mines_cells:
-            board[i][j] = 9
-        for i in range(1, self.rows + 1):
-            for j in range(1, self.cols + 1):
-                if board[i][j] > 8:
-                    for di, dj in self.neighbors:
-                        board[i + di][j + dj] += 1
+        board, self.mines_cells = generate_board(self.rows, self.cols, self.num_mines, self.rng, self.topology)
         return board
 
     def swap_if_bomb(self, x: int, y: int) -> bool:
         """
         Генерирует координаты новой бомбы, если при первом клике по игровому полю находится мина.
-        Обновляет соседей в матрице вокруг новой и старой бомбы и самих себя.
+        Перенос запоминается в swapped и попадает в историю вместе с открытием, чтобы его можно было отменить.
         Возвращает True если подмена была и False если нет.
 
         :param x: Координата x начальной ячейки.
@@ -118,101 +474,166 @@ class MinesweeperModel:
             return False
         dx, dy = x, y
         while (dx, dy) in self.mines_cells:
-            dx = randint(1, self.rows)
-            dy = randint(1, self.cols)
-        self.mines_cells.remove((x, y))
-        self.mines_cells.add((dx, dy))
-        self.board[x][y] = 0
-        self.board[dx][dy] = 9
-        for i, j in self.neighbors:
-            ni, nj = x + i, y + j
-            if self.board[ni][nj] < 9:
-                self.board[ni][nj] -= 1
-            else:
-                self.board[x][y] += 1
-        for i, j in self.neighbors:
-            ni, nj = dx + i, dy + j
-            self.board[ni][nj] += 1
+            dx = self.rng.randint(1, self.rows)
+            dy = self.rng.randint(1, self.cols)
+        self.move_mine((x, y), (dx, dy))
+        self.swapped = (x, y), (dx, dy)
         return True
 
-    def bfs(self, x: int, y: int, marked_bombs_nearby: set = None) -> set:
+    def move_mine(self, source: tuple, target: tuple) -> None:
         """
-        Обходит таблицу и возвращает множество ячеек, которые можно открыть после клика.
+        Переносит мину из ячейки source в пустую ячейку target.
+        Обновляет соседей в матрице вокруг новой и старой бомбы и самих себя.
+        """
+        (x, y), (dx, dy) = source, target
+        self.mines_cells.remove(source)
+        self.mines_cells.add(target)
+        self.bbbv = None
+        self.board[x][y] -= 9
+        self.board[dx][dy] += 9
+        for i, j in self.neighbors(x, y):
+            self.board[i][j] -= 1
+        for i, j in self.neighbors(dx, dy):
+            self.board[i][j] += 1
+
+    def bfs(self, x: int, y: int, chord: bool = False) -> ChangeList:
+        """
+        Обходит таблицу в ширину, открывает ячейки, которые можно открыть после клика,
+        и возвращает их список изменений в порядке обхода, то есть от места клика.
 
         :param x: Координата x начальной ячейки.
         :param y: Координата y начальной ячейки.
-        :param marked_bombs_nearby: Соседи ячейки board[x][y], которые помечены как бомбы.
+        :param chord: Клик по открытой цифре, вокруг которой помечены все мины:
+            открываются все соседи без меток.
         """
+        start = len(self.changes)
+        added = []
+        queue = deque()
 
-        hashset = set()
-        queue = set()
-        queue.add((x, y))
-        self_visited = False
-
-        while queue:
-            dx, dy = next(iter(queue))
-            queue.remove((dx, dy))
-
-            # Сюда заходим если игрок кликнул, по уже открытой цифре и пришел не пустой set marked_bombs_nearby
-            if marked_bombs_nearby and not self_visited and (dx, dy) == (x, y):
-                self_visited = True
-
-                for di, dj in self.neighbors:
-                    i, j = dx + di, dy + dj
-                    if self.is_valid_cell(i, j):
-                        if (i, j) not in marked_bombs_nearby:
-                            queue.add((i, j))
-
-            # Добавляем текущую ячейку в множество открываемых ячеек
-            hashset.add((dx - 1, dy - 1))
+        # Ячейка открывается при постановке в очередь, поэтому в очередь она попадает один раз
+        def visit(i: int, j: int) -> None:
+            added.append((i, j))
+            queue.append((i, j))
 
-            # Добавляем текущую ячейку в множество уже открытых ячеек
-            self.uncover_cells.add((dx, dy))
+        if chord:
+            # Сюда заходим если игрок кликнул по уже открытой цифре и все мины вокруг помечены
+            for i, j in self.neighbors(x, y):
+                if self.is_valid_cell(i, j):
+                    visit(i, j)
+        elif (x, y) not in self.uncover_cells:
+            visit(x, y)
+        self.uncover(added)
 
-            # Если текущая ячейка не пуста, пропускаем ее и переходим к следующей
+        while queue:
+            dx, dy = queue.popleft()
+            # Если текущая ячейка не пуста, ее соседи не открываются
             if self.board[dx][dy]:
                 continue
-
-            for di, dj in self.neighbors:
-                i, j = dx + di, dy + dj
+            first = len(added)
+            for i, j in self.neighbors(dx, dy):
                 if self.is_valid_cell(i, j):
-                    queue.add((i, j))
+                    visit(i, j)
+            self.uncover(added[first:])
 
-        return hashset
+        # В историю записываются только новые ячейки, этого достаточно для отмены и повтора
+        if added:
+            swapped, self.swapped = self.swapped, None
+            self.history.push(("reveal", x, y, tuple(added), not chord and self.board[x][y] > 8, swapped))
+        return self.changes.since(start)
 
     def is_valid_cell(self, i: int, j: int) -> bool:
-        """Проверка для BFS"""
-        return ((0 < i <= self.rows and 0 < j <= self.cols)
-                and (i, j) not in self.uncover_cells and (i, j) not in self.marked_cells)
+        """Проверка для BFS: соседи берутся из таблицы топологии и всегда лежат на доске"""
+        return (i, j) not in self.uncover_cells and (i, j) not in self.marked_cells
 
-    def compare_marked_bombs_with_real_ones(self, bombs_set: set, x: int, y: int) -> any:
+    def compare_marked_bombs_with_real_ones(self, x: int, y: int) -> any:
         """
-        Сравнивает координаты помеченных бомб с реальными,
+        Сравнивает метки вокруг открытой цифры (x, y) с реальными минами по счетчикам соседей,
         возвращает true, если координаты помеченных, ячеек совпадают с реальными;
         возвращает false, если помеченных бомб меньше или больше, чем реальных;
         возвращает lose, если их количество совпадает, а координаты нет
         """
-        truly = 0
-        counter = 0
-        for di, dj in self.neighbors:
-            i, j = x + di, y + dj
-            if self.board[i][j] > 8:
-                counter += 1
-                if (i, j) in bombs_set:
-                    truly += 1
-        if counter != len(bombs_set):
+        marked = self.flag_counts[x][y]
+        if marked != self.board[x][y]:
             return False
-        if truly == counter:
+        if self.true_flag_counts[x][y] == marked:
             return True
+        # Проигрыш без открытия ячеек тоже ход: его можно отменить
+        self.history.push(("reveal", x, y, (), True, None))
         return 'lose'
 
+
+class MinesweeperModel(BoardModel):
+    mapp = {'Easy': (9, 9, 10), 'Medium': (16, 16, 40), 'Hard': (16, 30, 99)}
+
+    def __init__(self, controller, seed: int = None):
+        """
+        Инициализирует экземпляр MinesweeperModel.
+
+        :param controller: Контроллер игры.
+        :param seed: Зерно генератора случайных чисел, для воспроизводимых партий (по умолчанию случайное).
+        """
+        self.controller = controller
+        self.encryptor = DataEncryptor(b'7yqZ7Fq^#3Cr3%nY')  # Длина должна быть 16 символов
+        self.scoreboard = ModelScoreboard(ShardedRecords(self.encryptor))
+        self.difficulty = self.scoreboard.get_last_difficulty()
+        # self.scoreboard.set_default()
+
+        super().__init__(*self.mapp[self.difficulty], seed)
+
+    def set_difficulty(self, difficulty: str) -> None:
+        """
+        Установка сложности игры. (Easy, Medium, Hard)
+        """
+        self.difficulty = difficulty
+        self.scoreboard.records["CurrentDifficulty"] = difficulty
+        self.rows, self.cols, self.num_mines = self.mapp[self.difficulty]
+
     def save_settings(self) -> None:
         """
-        Скрипт для сохранения таблицы рекордов с настройками в один файл
+        Сохраняет настройки и измененные таблицы рекордов
         """
         self.scoreboard.records["LastDifficulty"] = self.difficulty
         self.scoreboard.records["CurrentDifficulty"] = self.difficulty
-        self.encryptor.save_records(self.scoreboard.records)
+        self.scoreboard.records.save()
+
+
+class MoveHistory:
+    """
+    История ходов для отмены и повтора. Ход хранится как дельта, а не как копия доски:
+    ("reveal", x, y, открытые ходом ячейки, проигрыш, перенос мины первого клика или None)
+    или ("flag", x, y, новое состояние метки).
+    Память растет с количеством сыгранных ходов, а не с размером доски.
+    """
+
+    def __init__(self) -> None:
+        self.undo_stack = []
+        self.redo_stack = []
+
+    def push(self, move: tuple) -> None:
+        """Записывает новый ход, отмененные ходы после него больше нельзя повторить"""
+        self.undo_stack.append(move)
+        if self.redo_stack:
+            self.redo_stack = []
+
+    def undo(self) -> tuple:
+        """Переносит последний ход в стек повтора и возвращает его"""
+        if not self.undo_stack:
+            return None
+        move = self.undo_stack.pop()
+        self.redo_stack.append(move)
+        return move
+
+    def redo(self) -> tuple:
+        """Переносит последний отмененный ход обратно и возвращает его"""
+        if not self.redo_stack:
+            return None
+        move = self.redo_stack.pop()
+        self.undo_stack.append(move)
+        return move
+
+    def clear(self) -> None:
+        self.undo_stack = []
+        self.redo_stack = []
 
 
 class DataEncryptor:
@@ -278,25 +699,129 @@ class DataEncryptor:
         except ValueError:
             pass
 
+    def load_file(self, path: str) -> str:
+        """
+        Читает и дешифрует файл. Возвращает текст или None, если файла нет или он поврежден.
+
+        :param path: Путь к файлу.
+        """
+        try:
+            with open(path, "rb") as file:
+                return self.__decrypt(file.read())
+        except (FileNotFoundError, TypeError, ValueError):
+            # Пустой или обрезанный файл не дешифруется: ord("") при снятии дополнения бросает TypeError
+            return None
+
+    def save_file(self, path: str, text: str) -> None:
+        """
+        Шифрует текст и атомарно записывает его в файл: сбой во время записи не оставит файл обрезанным.
+
+        :param path: Путь к файлу.
+        :param text: Текст для записи.
+        """
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(self.__encrypt(text))
+        os.replace(temporary, path)
+
     def load_records(self) -> json:
         """
-        Загружает настройки для игры из файла в контейнер json, если ловит ошибку, возвращает None.
+        Загружает рекорды старого формата (один файл records) в контейнер json, если ловит ошибку, возвращает None.
         """
         try:
-            with open(self.path, "rb") as file:
-                encrypted_data = file.read()
-                decrypted_data = self.__decrypt(encrypted_data)
-                return json.loads(decrypted_data)
-        except (FileNotFoundError, TypeError, json.JSONDecodeError):
+            return json.loads(self.load_file(self.path))
+        except (TypeError, json.JSONDecodeError):
             return None
 
     def save_records(self, jsn: json) -> None:
         """
         Сохраняет рекорды в файл.
         """
-        encrypted_data = self.__encrypt(json.dumps(jsn))
-        with open(self.path, "wb") as file:
-            file.write(encrypted_data)
+        self.save_file(self.path, json.dumps(jsn))
+
+
+class ShardedRecords(dict):
+    """
+    Таблица рекордов по частям в каталоге scores: настройки (последний игрок, уровни сложности, индекс вставки)
+    читаются при запуске, а таблица каждого уровня сложности лежит в своем зашифрованном файле
+    и читается при первом обращении к ее ключу (__missing__): когда окно рекордов открывает ее страницу
+    или победу нужно сравнить с таблицей. При сохранении переписываются настройки и только измененные таблицы,
+    поэтому запуск и выход не зависят от количества таблиц и записей в них.
+    Рекорды старого формата из одного файла records переносятся при первом запуске.
+    """
+
+    SETTINGS = "settings"
+
+    def __init__(self, encryptor: DataEncryptor, directory: str = RECORDS_DIR, loaded: dict = None) -> None:
+        """
+        :param encryptor: Шифрование файлов.
+        :param directory: Каталог с файлами таблицы.
+        :param loaded: Уже прочитанные части, тогда файлы не читаются (см. copy).
+        """
+        super().__init__()
+        self.encryptor = encryptor
+        self.directory = directory
+        # JSON таблиц в том виде, в каком они лежат в файлах, чтобы не переписывать неизмененные
+        self.saved = {}
+        if loaded is not None:
+            self.update(loaded)
+            return
+        settings = self.load_shard(self.SETTINGS)
+        if settings is None:
+            self.migrate()
+        else:
+            self.update(settings)
+
+    def shard_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load_shard(self, name: str) -> any:
+        """Читает часть таблицы из файла, возвращает ее или None, если файла нет или он поврежден"""
+        try:
+            text = self.encryptor.load_file(self.shard_path(name))
+            data = json.loads(text)
+        except (TypeError, json.JSONDecodeError):
+            return None
+        self.saved[name] = text
+        return data
+
+    def migrate(self) -> None:
+        """Делит рекорды старого формата на настройки и таблицы и сразу сохраняет их по частям"""
+        records = self.encryptor.load_records()
+        if not isinstance(records, dict):
+            return
+        for level in DIFFICULTIES:
+            rows = records.pop(level, None)
+            if rows:
+                self[level] = ModelScoreboard.pad_rows(rows)
+        self.update(records)
+        self.save()
+
+    def __missing__(self, key: str) -> list:
+        if key not in DIFFICULTIES:
+            raise KeyError(key)
+        rows = self.load_shard(key)
+        if rows is None:
+            rows = [ModelScoreboard.empty_row() for _ in range(10)]
+        self[key] = ModelScoreboard.pad_rows(rows)
+        return self[key]
+
+    def copy(self) -> "ShardedRecords":
+        """Поверхностная копия: непрочитанные таблицы копии тоже читаются из файлов при обращении"""
+        clone = ShardedRecords(self.encryptor, self.directory, self)
+        clone.saved = self.saved
+        return clone
+
+    def save(self) -> None:
+        """Записывает настройки и прочитанные таблицы, которые изменились с последнего чтения или записи"""
+        os.makedirs(self.directory, exist_ok=True)
+        parts = {self.SETTINGS: {key: value for key, value in self.items() if key not in DIFFICULTIES}}
+        parts.update((level, self[level]) for level in DIFFICULTIES if level in self)
+        for name, data in parts.items():
+            text = json.dumps(data)
+            if text != self.saved.get(name):
+                self.encryptor.save_file(self.shard_path(name), text)
+                self.saved[name] = text
 
 
 class ModelScoreboard:
@@ -309,9 +834,11 @@ class ModelScoreboard:
         """
         Инициализирует таблицу рекордов.
 
-        :param scoreboard: Словарь существующей таблицы рекордов или None.
+        :param scoreboard: Таблица рекордов, обычно ShardedRecords: таблицы уровней сложности читаются при обращении.
         """
-        self.records = scoreboard or self.set_default()
+        self.records = scoreboard
+        if "LastDifficulty" not in self.records:
+            self.records.update(self.default_settings())
 
     def get_last_difficulty(self) -> str:
         """
@@ -321,7 +848,7 @@ class ModelScoreboard:
         try:
             return self.records["LastDifficulty"]
         except (KeyError, TypeError):
-            self.set_default()
+            self.records.update(self.default_settings())
             return "Medium"
 
     def get_table_records(self) -> json:
@@ -330,15 +857,28 @@ class ModelScoreboard:
         """
         return self.records
 
-    def get_modify_table_records(self, time: str) -> json:
+    @classmethod
+    def pad_rows(cls, rows: list) -> list:
+        """
+        Дополняет записи из старых файлов, где были только имя и время, пустыми показателями партии.
+        """
+        return [row + ["-"] * (len(cls.empty_row()) - len(row)) for row in rows]
+
+    @staticmethod
+    def empty_row() -> list:
+        """Пустая запись: имя, время, 3BV, 3BV/s, эффективность кликов"""
+        return ["-", "-", "-", "-", "-"]
+
+    def get_modify_table_records(self, time: str, stats: list = None) -> json:
         """
         Возвращает модифицированную таблицу рекордов (измененный JSON).
 
         :param time: Время для проверки.
+        :param stats: Показатели партии [3BV, 3BV/s, эффективность], см. BoardModel.get_game_stats.
         :return: Возвращает модифицированную таблицу рекордов в формате JSON.
         """
         modify_records = self.records.copy()  # Поверхностная копия
-        new_array, new_index = self.append_record(time)
+        new_array, new_index = self.append_record(time, stats)
         modify_records[self.records["CurrentDifficulty"]] = new_array
         modify_records["Index"] = new_index
         return modify_records
@@ -364,29 +904,29 @@ class ModelScoreboard:
             return True
         return time < self.records[difficulty][9][1]
 
-    def append_record(self, time: str) -> tuple[list, int]:
+    def append_record(self, time: str, stats: list = None) -> tuple[list, int]:
         """
         Эта функция создает новый список рекордов для текущего уровня сложности игры,
         в который вставляется новая запись о времени игрока. Затем она возвращает этот новый список и индекс,
         на котором была выполнена вставка новой записи.
 
         :param time: Время игрока.
+        :param stats: Показатели партии, без них записываются пустые.
         :return: Кортеж
         """
         array = deepcopy(self.records[self.records["CurrentDifficulty"]])
         i = 0
         for i in range(len(array)):
             if array[i][1] == "-" or time < array[i][1]:
-                array.insert(i, [self.records["LastPlayer"], time])
+                array.insert(i, [self.records["LastPlayer"], time, *(stats or self.empty_row()[2:])])
                 break
         array.pop()
         return array, i
 
-    def set_default(self):
-        """
-        Устанавливает параметры по умолчанию для таблицы рекордов.
-        """
-        default = {
+    @staticmethod
+    def default_settings() -> dict:
+        """Настройки таблицы рекордов по умолчанию, без самих таблиц"""
+        return {
             # имя последнего игрока, для подстановки в поле ввода.
             "LastPlayer": "BLXNK",
             # установленный уровень сложности перед закрытием игры.
@@ -396,6 +936,12 @@ class ModelScoreboard:
             # индекс по которому были внесены изменения.
             "Index": 0
         }
-        for level in ["Easy", "Medium", "Hard"]:
-            default[level] = [["-", "-"] for _ in range(10)]
-        self.records = default
+
+    def set_default(self):
+        """
+        Устанавливает параметры по умолчанию для таблицы рекордов.
+        """
+        default = self.default_settings()
+        for level in DIFFICULTIES:
+            default[level] = [self.empty_row() for _ in range(10)]
+        self.records.update(default)
@@ -0,0 +1,234 @@
+import os
+import struct
+from collections import Counter
+
+# Окно 5x5 вокруг ячейки границы: бит r * 5 + c соответствует смещению (r - 2, c - 2)
+WINDOW = tuple((r - 2, c - 2) for r in range(5) for c in range(5))
+WINDOW_BITS = 25
+WINDOW_MASK = (1 << WINDOW_BITS) - 1
+# Ограничения берутся у центральных 3x3 ячеек окна: все их соседи лежат внутри окна
+INNER = tuple((a, b) for a in (-1, 0, 1) for b in (-1, 0, 1))
+INNER_NEIGHBORS = tuple(
+    sum(1 << ((a + da + 2) * 5 + b + db + 2) for da in (-1, 0, 1) for db in (-1, 0, 1) if da or db)
+    for a, b in INNER
+)
+NO_CONSTRAINT = 15
+# Повороты и отражения окна: для каждого - куда переходит бит окна и куда переходит ячейка центра
+SYMMETRIES = tuple(
+    (tuple((f(a, b)[0] + 2) * 5 + f(a, b)[1] + 2 for a, b in WINDOW),
+     tuple((f(a, b)[0] + 1) * 3 + f(a, b)[1] + 1 for a, b in INNER))
+    for f in (lambda a, b: (a, b), lambda a, b: (b, -a), lambda a, b: (-a, -b), lambda a, b: (-b, a),
+              lambda a, b: (a, -b), lambda a, b: (-a, b), lambda a, b: (b, a), lambda a, b: (-b, -a))
+)
+
+PATTERNS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "patterns.bin")
+MAGIC = b"MSPT"
+VERSION = 1
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<QII")
+
+
+def pattern_key(model, x: int, y: int) -> int:
+    """
+    Кодирует окрестность ячейки (x, y) в ключ таблицы образцов.
+
+    Младшие 25 бит - закрытые ячейки без меток окна 5x5, соседние хотя бы с одним ограничением;
+    следующие 9 полей по 4 бита - сколько мин осталось найти у каждой ячейки центра 3x3,
+    или 15, если ячейка не на границе. Метки учтены в остатке, поэтому сами в ключ не входят.
+
+    :param model: Модель BoardModel.
+    :param x: Строка ячейки границы.
+    :param y: Столбец ячейки границы.
+    """
+    key = 0
+    around = 0
+    frontier = model.frontier
+    for index, (a, b) in enumerate(INNER):
+        count = NO_CONSTRAINT
+        if (x + a, y + b) in frontier:
+            mines_left, unknown_count = model.constraint(x + a, y + b)
+            # Ограничение с лишними метками противоречиво, выводить из него нечего
+            if 0 <= mines_left <= unknown_count:
+                count = mines_left
+                around |= INNER_NEIGHBORS[index]
+        key |= count << (WINDOW_BITS + 4 * index)
+    rows, cols = model.rows, model.cols
+    uncovered, marked = model.uncover_cells, model.marked_cells
+    for bit, (a, b) in enumerate(WINDOW):
+        if around >> bit & 1:
+            i, j = x + a, y + b
+            if 0 < i <= rows and 0 < j <= cols and (i, j) not in uncovered and (i, j) not in marked:
+                key |= 1 << bit
+    return key
+
+
+def move_bits(mask: int, targets: tuple) -> int:
+    """Переставляет биты маски окна: бит bit переходит в targets[bit]"""
+    moved = 0
+    for bit, target in enumerate(targets):
+        if mask >> bit & 1:
+            moved |= 1 << target
+    return moved
+
+
+def transform(key: int, safe: int, mines: int, symmetry: tuple) -> tuple[int, int, int]:
+    """Применяет поворот или отражение окна к ключу и маскам вывода"""
+    window, inner = symmetry
+    moved = move_bits(key & WINDOW_MASK, window)
+    for index, target in enumerate(inner):
+        moved |= (key >> (WINDOW_BITS + 4 * index) & 15) << (WINDOW_BITS + 4 * target)
+    return moved, move_bits(safe, window), move_bits(mines, window)
+
+
+def canonical(key: int, safe: int, mines: int) -> tuple[int, int, int]:
+    """Вариант образца с наименьшим ключом среди всех поворотов и отражений"""
+    return min(transform(key, safe, mines, symmetry) for symmetry in SYMMETRIES)
+
+
+def window_moves(x: int, y: int, safe: int, mines: int) -> list:
+    """Переводит маски вывода окна вокруг (x, y) в ходы [("reveal" или "flag", i, j)]"""
+    moves = []
+    for bit, (a, b) in enumerate(WINDOW):
+        if safe >> bit & 1:
+            moves.append(("reveal", x + a, y + b))
+        elif mines >> bit & 1:
+            moves.append(("flag", x + a, y + b))
+    return moves
+
+
+def solve_pattern(key: int) -> tuple[int, int]:
+    """
+    Перебором с возвратом находит все расстановки мин в закрытых ячейках окна, согласные с ограничениями ключа.
+
+    :return: (маска ячеек, безопасных во всех расстановках, маска ячеек с миной во всех расстановках).
+        Если расстановок нет, обе маски пустые.
+    """
+    unknown = key & WINDOW_MASK
+    constraints = []
+    for index in range(9):
+        count = key >> (WINDOW_BITS + 4 * index) & 15
+        if count != NO_CONSTRAINT:
+            constraints.append((INNER_NEIGHBORS[index] & unknown, count))
+    cells = [1 << bit for bit in range(WINDOW_BITS) if unknown >> bit & 1]
+    always_mine = unknown
+    always_safe = unknown
+    found = False
+
+    def search(position: int, assigned: int, mines: int) -> None:
+        nonlocal always_mine, always_safe, found
+        for cells_mask, count in constraints:
+            placed = (mines & cells_mask).bit_count()
+            if placed > count or placed + (cells_mask & ~assigned).bit_count() < count:
+                return
+        if position == len(cells):
+            found = True
+            always_mine &= mines
+            always_safe &= ~mines
+            return
+        cell = cells[position]
+        search(position + 1, assigned | cell, mines)
+        search(position + 1, assigned | cell, mines | cell)
+
+    search(0, 0, 0)
+    if not found:
+        return 0, 0
+    return always_safe & unknown, always_mine & unknown
+
+
+class PatternTable:
+    """
+    Таблица образцов: ключ окрестности (pattern_key) -> (маска безопасных ячеек, маска мин) окна 5x5.
+    Таблица строится заранее (main.py patterns) и хранится двоичным файлом: заголовок MSPT, версия,
+    количество записей и записи <QII> (ключ, безопасные, мины). В файл попадают только ключи с выводами
+    и только по одному варианту из поворотов и отражений; при загрузке варианты восстанавливаются,
+    поэтому поиск остается одним обращением к словарю.
+    """
+
+    def __init__(self, entries: dict = None) -> None:
+        self.entries = {} if entries is None else entries
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: str = PATTERNS_PATH) -> "PatternTable":
+        """Загружает таблицу из файла. Если файла нет, таблица пустая и решатель обходится без нее"""
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return cls()
+        magic, version, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a pattern table of version {VERSION}")
+        records = RECORD.iter_unpack(data[HEADER.size:HEADER.size + count * RECORD.size])
+        entries = {}
+        for record in records:
+            for symmetry in SYMMETRIES:
+                key, safe, mines = transform(*record, symmetry)
+                entries[key] = (safe, mines)
+        return cls(entries)
+
+    def save(self, path: str = PATTERNS_PATH) -> None:
+        records = sorted({canonical(key, *found) for key, found in self.entries.items()})
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+            for record in records:
+                file.write(RECORD.pack(*record))
+
+    def get(self, key: int) -> tuple:
+        """Возвращает (безопасные, мины) для ключа или None"""
+        found = self.entries.get(key)
+        if found is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return found
+
+
+class PatternCollector(PatternTable):
+    """
+    Таблица для построения файла образцов: ключи, которых еще нет, решаются перебором на месте,
+    и для каждого ключа считается, сколько раз он встретился. Знает ответ для любого ключа.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.seen = Counter()
+
+    def get(self, key: int) -> tuple:
+        self.seen[key] += 1
+        found = self.entries.get(key)
+        if found is None:
+            found = self.entries[key] = solve_pattern(key)
+        return found
+
+    def productive(self, min_count: int = 1) -> PatternTable:
+        """Таблица из ключей с выводами, которые вместе с поворотами и отражениями встретились не меньше min_count раз"""
+        counts = Counter()
+        for key, count in self.seen.items():
+            counts[canonical(key, 0, 0)[0]] += count
+        return PatternTable({key: found for key, found in self.entries.items()
+                             if any(found) and counts[canonical(key, 0, 0)[0]] >= min_count})
+
+
+def collect_patterns(boards: list, games: int, seed: int = 0, min_count: int = 1) -> tuple[PatternTable, Counter]:
+    """
+    Строит таблицу образцов из окрестностей, которые встречаются в партиях решателя.
+
+    :param boards: Список досок (rows, cols, mines).
+    :param games: Количество партий на каждой доске.
+    :param seed: Зерно первой партии.
+    :param min_count: Сколько раз образец должен встретиться, чтобы попасть в таблицу.
+    :return: (таблица, сколько раз встретился каждый ключ).
+    """
+    from headless import BatchStats, HeadlessGame, play_game
+    from solver import Solver
+
+    collector = PatternCollector()
+    solver = Solver(collector)
+    stats = BatchStats()
+    for rows, cols, mines in boards:
+        game = HeadlessGame(rows, cols, mines, seed)
+        for index in range(games):
+            play_game(game, solver, stats, seed + index)
+    return collector.productive(min_count), collector.seen
@@ -0,0 +1,230 @@
+import cProfile
+import io
+import json
+import os.path
+import pstats
+import tracemalloc
+from random import Random
+
+from controller import MinesweeperController
+
+
+def generate_click_script(difficulty: str, games: int, clicks: int, seed: int, sizes: dict) -> dict:
+    """
+    Генерирует скрипт кликов: для каждой партии New Game и серия случайных кликов.
+    Скрипт детерминирован для переданного seed.
+
+    :param difficulty: Уровень сложности (Easy, Medium, Hard).
+    :param games: Количество партий в скрипте.
+    :param clicks: Количество кликов в каждой партии.
+    :param seed: Зерно генератора, используется и для кликов, и для досок.
+    :param sizes: Таблица размеров досок, как MinesweeperModel.mapp.
+    """
+    rng = Random(seed)
+    rows, cols, _ = sizes[difficulty]
+    actions = [["difficulty", difficulty]]
+    for _ in range(games):
+        actions.append(["new_game"])
+        for _ in range(clicks):
+            # Примерно каждый восьмой клик ставит флаг, остальные открывают ячейки
+            kind = "right" if rng.random() < 0.125 else "left"
+            actions.append([kind, rng.randint(1, rows), rng.randint(1, cols)])
+    return {"difficulty": difficulty, "seed": seed, "actions": actions}
+
+
+def load_click_script(path: str) -> dict:
+    """
+    Загружает записанный скрипт кликов из JSON файла.
+    """
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+class ClickRecorder:
+    """
+    Записывает действия игрока в формате скрипта кликов, для последующего профилирования.
+    """
+
+    def __init__(self, path: str, difficulty: str, seed: int) -> None:
+        """
+        :param path: Путь к файлу, в который будет сохранен скрипт.
+        :param difficulty: Уровень сложности на момент старта записи.
+        :param seed: Зерно генератора досок, с которым запущена игра.
+        """
+        self.path = path
+        self.script = {"difficulty": difficulty, "seed": seed, "actions": [["difficulty", difficulty]]}
+
+    def record(self, *action) -> None:
+        """Добавляет действие в скрипт"""
+        self.script["actions"].append(list(action))
+
+    def save(self) -> None:
+        """Сохраняет скрипт в файл"""
+        with open(self.path, "w") as file:
+            json.dump(self.script, file)
+
+
+class ScriptPlayer:
+    """
+    Проигрывает скрипт кликов через контроллер и view, по одному действию за итерацию mainloop.
+    Модальные окна закрываются перед каждым действием, чтобы скрипт не ждал игрока.
+    Настройки и рекорды игрока при проигрывании не сохраняются, даже если окно закрыто вручную.
+    """
+
+    def __init__(self, controller: MinesweeperController, script: dict) -> None:
+        """
+        :param controller: Контроллер с созданным окном игры.
+        :param script: Скрипт кликов.
+        """
+        self.controller = controller
+        self.view = controller.view
+        self.difficulty = script["difficulty"]
+        self.seed = script.get("seed")
+        self.actions = script["actions"]
+        self.index = 0
+        self.resize_pending = False
+        self.view.protocol("WM_DELETE_WINDOW", self.stop)
+
+    def start(self) -> None:
+        """Запускает проигрывание и блокируется до его окончания"""
+        self.prepare()
+        self.view.after(0, self.step)
+        self.view.mainloop()
+
+    def prepare(self) -> None:
+        """
+        Ставит первую доску записи: контроллер создает ее по последнему уровню сложности из настроек игрока,
+        а запись начиналась на своем уровне. Доска строится заново из зерна записи, как в BoardModel(..., seed),
+        поэтому и она, и все следующие доски совпадают с записанными.
+        """
+        model = self.controller.model
+        model.set_difficulty(self.difficulty)
+        model.block_game_field = False
+        model.reload_board(seed=self.seed)
+        self.view.top_panel.difficulty_box.set(self.difficulty)
+        self.view.game_field.update_buttons()
+        self.view.bottom_panel.timer.clear_timer()
+        self.view.bottom_panel.bomb_counter.clear_bomb_counter()
+        self.view.update_window_size()
+
+    def stop(self) -> None:
+        """Завершает проигрывание без program_close_handler, чтобы не записать настройки проигрывания"""
+        self.controller.executor.shutdown()
+        self.controller.metrics.shutdown()
+        self.view.destroy()
+
+    def close_modals(self) -> bool:
+        """
+        Закрывает показанные модальные окна. Возвращает False, если какое-то окно еще не показано:
+        его нельзя закрывать, пока оно ждет своей видимости.
+        """
+        for win in (self.view.modal, self.view.scoreboard):
+            if win is not None and win.shown:
+                if not win.winfo_viewable():
+                    return False
+                win.hide()
+        return True
+
+    def step(self) -> None:
+        """Выполняет одно действие скрипта и планирует следующее"""
+        # Следующее действие ждет, пока фоновый поток не подготовит новую доску
+        if self.controller.executor.busy or not self.close_modals():
+            self.view.after(10, self.step)
+            return
+        if self.index >= len(self.actions):
+            self.stop()
+            return
+        action, *args = self.actions[self.index]
+        self.index += 1
+        self.perform(action, *args)
+        self.view.update_idletasks()
+        self.view.after(0, self.step)
+
+    def perform(self, action: str, *args) -> None:
+        """Передает действие в контроллер так же, как это делают обработчики событий view"""
+        if action == "difficulty":
+            self.controller.model.set_difficulty(args[0])
+            self.view.top_panel.difficulty_box.set(args[0])
+            self.resize_pending = True
+        elif action == "new_game":
+            self.controller.new_game_handler(None, resize=self.resize_pending)
+            self.resize_pending = False
+        elif action in ("left", "right"):
+            x, y = args
+            button = self.view.game_field.buttons[x - 1][y - 1]
+            if action == "left":
+                self.controller.left_click_handler(button)
+            else:
+                self.controller.right_click_handler(button)
+        elif action == "undo":
+            self.controller.undo_handler(None)
+        elif action == "redo":
+            self.controller.redo_handler(None)
+
+
+class ProfileSession:
+    """
+    Запускает скрипт кликов под cProfile или tracemalloc и сохраняет результаты в каталог.
+    """
+
+    def __init__(self, script: dict, output_dir: str, top: int = 40) -> None:
+        """
+        :param script: Скрипт кликов.
+        :param output_dir: Каталог для файлов со статистикой.
+        :param top: Количество строк в текстовых отчетах.
+        """
+        self.script = script
+        self.output_dir = output_dir
+        self.top = top
+        os.makedirs(output_dir, exist_ok=True)
+
+    def play(self) -> None:
+        """Создает окно игры и проигрывает в нем скрипт"""
+        controller = MinesweeperController(seed=self.script.get("seed"))
+        ScriptPlayer(controller, self.script).start()
+
+    def run_cprofile(self) -> str:
+        """
+        Проигрывает скрипт под cProfile, сохраняет бинарную статистику и текстовый отчет.
+        Возвращает путь к текстовому отчету.
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+        self.play()
+        profiler.disable()
+
+        profiler.dump_stats(os.path.join(self.output_dir, "cprofile.prof"))
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats("cumulative").print_stats(self.top)
+        stats.sort_stats("tottime").print_stats(self.top)
+        path = os.path.join(self.output_dir, "cprofile.txt")
+        with open(path, "w") as file:
+            file.write(stream.getvalue())
+        return path
+
+    def run_tracemalloc(self) -> str:
+        """
+        Проигрывает скрипт под tracemalloc и сохраняет сводку аллокаций.
+        Возвращает путь к отчету.
+        """
+        tracemalloc.start(25)
+        self.play()
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        lines = [f"Current: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB", ""]
+        lines.append(f"Top {self.top} allocations by line:")
+        lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:self.top])
+        lines.append("")
+        lines.append(f"Top {self.top} allocations by file:")
+        lines.extend(str(stat) for stat in snapshot.statistics("filename")[:self.top])
+        path = os.path.join(self.output_dir, "tracemalloc.txt")
+        with open(path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+        return path
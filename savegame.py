@@ -0,0 +1,164 @@
+import mmap
+import os
+import struct
+from itertools import compress
+
+from changes import MINE, FLAG, UNFLAG, COVER
+
+SAVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "savegame")
+MAGIC = b"MSSV"
+VERSION = 2
+# Заголовок: magic, версия, флаги, rows, cols, mines, зерно доски; затем прогресс: время и клики
+LAYOUT = struct.Struct("<4sHHIIIQ")
+FLAGS_OFFSET = 6
+# Флаги заголовка: партия закончена; зерно доски известно (0 - тоже зерно)
+FINISHED = 0x1
+HAS_SEED = 0x2
+PROGRESS = struct.Struct("<dI")
+PROGRESS_OFFSET = 32
+CELLS_OFFSET = 64
+# Байт ячейки: младшие 5 бит - значение доски (цифра или 9 и больше для мины), затем открыта и помечена
+VALUE_BITS = 0x1F
+REVEALED = 0x20
+FLAGGED = 0x40
+VALUES = bytes(byte & VALUE_BITS for byte in range(256))
+IS_MINE = bytes((byte & VALUE_BITS) > 8 for byte in range(256))
+IS_REVEALED = bytes(bool(byte & REVEALED) for byte in range(256))
+IS_FLAGGED = bytes(bool(byte & FLAGGED) for byte in range(256))
+
+
+class SavedGame:
+    """
+    Незаконченная партия в двоичном файле постоянной разметки: заголовок 64 байта и по байту на ячейку
+    в порядке номеров ячеек (x - 1) * cols + (y - 1). Файл открыт через mmap, поэтому каждый ход
+    записывает только байты своих ячеек (apply_changes получает тот же список изменений, что и отрисовщик),
+    а при выходе файл не переписывается. История отмены не сохраняется.
+    """
+
+    def __init__(self, path: str = SAVE_PATH) -> None:
+        """
+        :param path: Путь к файлу сохранения.
+        """
+        self.path = path
+        self.file = None
+        self.map = None
+
+    def open(self) -> tuple:
+        """
+        Открывает существующий файл. Возвращает (rows, cols, mines) сохраненной доски или None,
+        если файла нет или он не является сохранением этой версии.
+        """
+        self.close()
+        try:
+            file = open(self.path, "r+b")
+        except FileNotFoundError:
+            return None
+        size = os.fstat(file.fileno()).st_size
+        if size < CELLS_OFFSET:
+            file.close()
+            return None
+        self.file, self.map = file, mmap.mmap(file.fileno(), 0)
+        magic, version, _, rows, cols, mines, _ = LAYOUT.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or size != CELLS_OFFSET + rows * cols:
+            self.close()
+            return None
+        return rows, cols, mines
+
+    def start(self, model) -> None:
+        """Записывает новую доску модели, файл создается или меняет размер под нее"""
+        size = CELLS_OFFSET + model.rows * model.cols
+        if self.map is None or len(self.map) != size:
+            self.close()
+            with open(self.path, "wb") as file:
+                file.truncate(size)
+            self.file = open(self.path, "r+b")
+            self.map = mmap.mmap(self.file.fileno(), 0)
+        seed = model.game_seed
+        LAYOUT.pack_into(self.map, 0, MAGIC, VERSION, 0 if seed is None else HAS_SEED,
+                         model.rows, model.cols, model.num_mines, seed or 0)
+        PROGRESS.pack_into(self.map, PROGRESS_OFFSET, 0.0, 0)
+        self.write_board(model)
+
+    def write_board(self, model) -> None:
+        """Переписывает все ячейки, например после переноса мины первым кликом"""
+        uncovered, marked = model.uncover_cells, model.marked_cells
+        cells = bytearray()
+        for x in range(1, model.rows + 1):
+            row = model.board[x]
+            for y in range(1, model.cols + 1):
+                cells.append(row[y] | (REVEALED if (x, y) in uncovered else 0)
+                             | (FLAGGED if (x, y) in marked else 0))
+        self.map[CELLS_OFFSET:] = cells
+
+    def apply_changes(self, changes, elapsed: float, clicks: int) -> None:
+        """
+        Записывает изменения хода в ячейки файла.
+
+        :param changes: Список изменений ChangeList.
+        :param elapsed: Время партии в секундах.
+        :param clicks: Клики партии.
+        """
+        cells = self.map
+        for cell, code in changes:
+            offset = CELLS_OFFSET + cell
+            if code <= MINE:
+                cells[offset] |= REVEALED
+            elif code == COVER:
+                cells[offset] &= ~REVEALED & 0xFF
+            elif code == FLAG:
+                cells[offset] |= FLAGGED
+            elif code == UNFLAG:
+                cells[offset] &= ~FLAGGED & 0xFF
+            # Остальные коды только показывают конец партии и состояние доски не меняют
+        self.save_progress(elapsed, clicks)
+
+    def set_finished(self, finished: bool) -> None:
+        """Отмечает партию законченной (победа или поражение) или снова идущей после отмены поражения"""
+        flags = struct.unpack_from("<H", self.map, FLAGS_OFFSET)[0]
+        flags = flags | FINISHED if finished else flags & ~FINISHED
+        struct.pack_into("<H", self.map, FLAGS_OFFSET, flags)
+
+    def save_progress(self, elapsed: float, clicks: int) -> None:
+        """Записывает время и клики партии"""
+        PROGRESS.pack_into(self.map, PROGRESS_OFFSET, elapsed, clicks)
+
+    def restore(self, model) -> float:
+        """
+        Восстанавливает в модели сохраненную партию и добавляет в изменения модели все поле для отрисовки.
+        Размер доски модели должен совпадать с сохраненным (см. open).
+        Возвращает время партии в секундах или None, если партия не начата или уже закончена.
+        """
+        rows, cols = model.rows, model.cols
+        _, _, flags, _, _, _, seed = LAYOUT.unpack_from(self.map)
+        if flags & FINISHED:
+            return None
+        if not flags & HAS_SEED:
+            seed = None
+        elapsed, clicks = PROGRESS.unpack_from(self.map, PROGRESS_OFFSET)
+        data = self.map[CELLS_OFFSET:CELLS_OFFSET + rows * cols]
+        numbers = range(rows * cols)
+        revealed = [model.cell_coords(cell) for cell in compress(numbers, data.translate(IS_REVEALED))]
+        mines = {model.cell_coords(cell) for cell in compress(numbers, data.translate(IS_MINE))}
+        if not revealed or len(revealed) == rows * cols - len(mines) or not mines.isdisjoint(revealed):
+            return None
+
+        values = data.translate(VALUES)
+        border = [0] * (cols + 2)
+        board = [border] + [[0, *values[i * cols:(i + 1) * cols], 0] for i in range(rows)] + [border[:]]
+        model.reload_board((board, mines), seed)
+        model.uncover(revealed)
+        for cell in compress(numbers, data.translate(IS_FLAGGED)):
+            model.set_mark_bomb(True, *model.cell_coords(cell))
+        model.game_over = False
+        model.clicks = clicks
+        model.take_changes()
+        model.emit_state()
+        return elapsed
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,243 @@
+import asyncio
+import json
+from itertools import count
+from random import Random
+from time import monotonic, perf_counter
+
+from headless import HeadlessGame
+from solver import Analyser
+
+
+class GameServer:
+    """
+    Сервер партий на asyncio: много независимых партий HeadlessGame в одном процессе.
+
+    Протокол - JSON по строкам через TCP, один запрос - одна строка, на каждый запрос одна строка ответа:
+        {"id": 1, "op": "new", "rows": 16, "cols": 30, "mines": 99, "seed": 5} -> {"id": 1, "session": 7}
+        {"id": 2, "op": "reveal", "session": 7, "x": 3, "y": 4}
+            -> {"id": 2, "status": "play", "cells": [65], "codes": [2]}
+        {"id": 3, "op": "flag", "session": 7, "x": 1, "y": 1} -> {"id": 3, "status": "play", "flag": true}
+        {"id": 4, "op": "hint", "session": 7} -> {"id": 4, "safe": [66, 67], "mines": [35]}
+        {"id": 5, "op": "close", "session": 7} -> {"id": 5, "closed": true}
+    Операция chord - это reveal по открытой цифре. Ответ - список изменений модели (см. changes.ChangeList):
+    номера ячеек (x - 1) * cols + (y - 1), открытых этим ходом, и их коды, 0-8 - цифры, 9 - мина.
+    Подсказка возвращает номера ячеек, которые следуют из открытых цифр; анализ общий для всех партий
+    и кэшируется по хэшу позиции, поэтому одинаковые позиции разных партий не пересчитываются.
+
+    Партии без запросов дольше idle_timeout удаляются. Ответы отправляются с ожиданием drain, поэтому
+    клиент, который не читает ответы, перестает получать обработку своих запросов, а не копит их в памяти.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, max_sessions: int = 10000,
+                 idle_timeout: float = 300.0) -> None:
+        """
+        :param host: Адрес для прослушивания.
+        :param port: Порт, 0 - выбрать свободный.
+        :param max_sessions: Сколько партий может существовать одновременно.
+        :param idle_timeout: Через сколько секунд без запросов партия удаляется.
+        """
+        self.host = host
+        self.port = port
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.last_used = {}
+        self.session_ids = count(1)
+        self.server = None
+        self.evictor = None
+        self.requests = 0
+        self.evicted = 0
+        self.analyser = Analyser()
+
+    async def start(self) -> None:
+        """Начинает принимать соединения и запускает удаление простаивающих партий"""
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.evictor = asyncio.create_task(self.evict_idle())
+
+    async def stop(self) -> None:
+        self.evictor.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def evict_idle(self) -> None:
+        """Периодически удаляет партии, к которым давно не было запросов"""
+        interval = min(self.idle_timeout / 2, 30.0)
+        while True:
+            await asyncio.sleep(interval)
+            deadline = monotonic() - self.idle_timeout
+            for session in [session for session, used in self.last_used.items() if used < deadline]:
+                self.close_session(session)
+                self.evicted += 1
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обрабатывает запросы соединения по очереди, пока клиент не отключится"""
+        try:
+            while line := await reader.readline():
+                writer.write(self.respond(line))
+                # Пока клиент не заберет ответы, следующий запрос не читается
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, line: bytes) -> bytes:
+        """Разбирает строку запроса и возвращает строку ответа"""
+        self.requests += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = self.dispatch(request)
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            response = {"error": str(error) or type(error).__name__}
+        response["id"] = request_id
+        return json.dumps(response, separators=(",", ":")).encode() + b"\n"
+
+    def dispatch(self, request: dict) -> dict:
+        """Выполняет операцию запроса над партией"""
+        op = request["op"]
+        if op == "new":
+            return self.new_session(request)
+
+        session = request["session"]
+        game = self.sessions.get(session)
+        if game is None:
+            raise KeyError(f"unknown session {session}")
+        self.last_used[session] = monotonic()
+        if op == "close":
+            self.close_session(session)
+            return {"closed": True}
+        if op == "hint":
+            safe, mines = self.analyser.hint(game.model)
+            cell_id = game.model.cell_id
+            return {"safe": [cell_id(*cell) for cell in safe], "mines": [cell_id(*cell) for cell in mines]}
+
+        x, y = int(request["x"]), int(request["y"])
+        model = game.model
+        if not (0 < x <= model.rows and 0 < y <= model.cols):
+            raise ValueError(f"cell {x}, {y} is outside the board")
+        if op in ("reveal", "chord"):
+            status, changes = game.reveal(x, y)
+            return {"status": status, "cells": changes.cells.tolist(), "codes": changes.codes.tolist()}
+        if op == "flag":
+            game.toggle_flag(x, y)
+            return {"status": "play", "flag": (x, y) in model.marked_cells}
+        raise ValueError(f"unknown op {op}")
+
+    def new_session(self, request: dict) -> dict:
+        """Создает партию с размером и зерном из запроса"""
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError("too many sessions")
+        rows, cols, mines = int(request["rows"]), int(request["cols"]), int(request["mines"])
+        if not (0 < rows <= 1000 and 0 < cols <= 1000 and 0 < mines < rows * cols):
+            raise ValueError(f"board {rows}x{cols} can't hold {mines} mines")
+        # Доска строится один раз, в конструкторе, из зерна запроса (без зерна - из случайного)
+        game = HeadlessGame(rows, cols, mines, request.get("seed"))
+        session = next(self.session_ids)
+        self.sessions[session] = game
+        self.last_used[session] = monotonic()
+        return {"session": session}
+
+    def close_session(self, session: int) -> None:
+        self.sessions.pop(session, None)
+        self.last_used.pop(session, None)
+
+
+def percentile(values: list, share: float) -> float:
+    """Перцентиль по отсортированному списку методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(share * len(values)) - 1))]
+
+
+class LoadTest:
+    """
+    Нагрузочный клиент: clients соединений играют случайными кликами, каждое ждет ответ перед
+    следующим запросом. Считает запросы в секунду и перцентили задержки.
+    """
+
+    def __init__(self, host: str, port: int, clients: int, duration: float, board: tuple, seed: int = 0) -> None:
+        """
+        :param host: Адрес сервера.
+        :param port: Порт сервера.
+        :param clients: Количество одновременных соединений.
+        :param duration: Длительность теста в секундах.
+        :param board: (rows, cols, mines) партий.
+        :param seed: Зерно для досок и случайных кликов.
+        """
+        self.host = host
+        self.port = port
+        self.clients = clients
+        self.duration = duration
+        self.board = board
+        self.seed = seed
+        self.latencies = []
+        self.errors = 0
+        self.games = 0
+        self.elapsed = 0.0
+
+    async def run(self) -> None:
+        start = perf_counter()
+        deadline = start + self.duration
+        await asyncio.gather(*(self.client(number, deadline) for number in range(self.clients)))
+        self.elapsed = perf_counter() - start
+
+    async def client(self, number: int, deadline: float) -> None:
+        """Одно соединение: партия за партией, пока не закончится время"""
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        rng = Random(self.seed * 100003 + number)
+        rows, cols, mines = self.board
+        request_id = count()
+
+        async def call(request: dict) -> dict:
+            request["id"] = next(request_id)
+            sent = perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            self.latencies.append(perf_counter() - sent)
+            if "error" in response:
+                self.errors += 1
+            return response
+
+        try:
+            while perf_counter() < deadline:
+                seed = rng.randrange(2 ** 32)
+                session = (await call({"op": "new", "rows": rows, "cols": cols, "mines": mines, "seed": seed}))
+                session = session["session"]
+                cells = [(i, j) for i in range(rows) for j in range(cols)]
+                rng.shuffle(cells)
+                hidden = set(cells)
+                status = "play"
+                while status == "play" and cells and perf_counter() < deadline:
+                    cell = cells.pop()
+                    if cell not in hidden:
+                        continue
+                    response = await call({"op": "reveal", "session": session, "x": cell[0] + 1, "y": cell[1] + 1})
+                    status = response["status"]
+                    hidden.difference_update(divmod(cell, cols) for cell in response["cells"])
+                await call({"op": "close", "session": session})
+                self.games += 1
+        finally:
+            writer.close()
+
+    def report(self) -> str:
+        latencies = sorted(self.latencies)
+        rate = len(latencies) / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"{self.clients} clients, {len(latencies)} requests, {self.games} games in {self.elapsed:.1f} s",
+            f"Requests/s:  {rate:.0f}",
+            f"Errors:      {self.errors}",
+        ]
+        for name, share in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            lines.append(f"Latency {name}: {percentile(latencies, share) * 1000:.3f} ms")
+        return "\n".join(lines)
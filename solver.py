@@ -0,0 +1,162 @@
+from collections import deque
+from random import Random
+
+from cache import LRUCache
+from patterns import PatternTable, pattern_key, solve_pattern, window_moves
+
+
+class RandomStrategy:
+    """Стратегия случайных кликов: открывает случайную закрытую ячейку без метки"""
+
+    name = "random"
+
+    def __init__(self) -> None:
+        self.game = None
+        self.cells = []
+
+    def reset(self, game, seed: int = None) -> None:
+        """
+        Подготавливает стратегию к новой партии.
+
+        :param game: Партия HeadlessGame.
+        :param seed: Зерно генератора случайных ходов. Обычно это и зерно доски, поэтому ходы берутся
+            из своего потока: с тем же зерном перемешивание повторило бы расстановку мин,
+            и первые догадки попадали бы в мины.
+        """
+        self.game = game
+        model = game.model
+        self.cells = [(i, j) for i in range(1, model.rows + 1) for j in range(1, model.cols + 1)]
+        Random(None if seed is None else f"strategy-{seed}").shuffle(self.cells)
+
+    def guess(self) -> tuple:
+        """Возвращает случайную закрытую ячейку без метки или None"""
+        model = self.game.model
+        while self.cells:
+            cell = self.cells.pop()
+            if cell not in model.uncover_cells and cell not in model.marked_cells:
+                return cell
+        return None
+
+    def next_move(self) -> tuple:
+        """Возвращает ход в виде ("reveal" или "flag", x, y) или None, если ходов нет"""
+        cell = self.guess()
+        return cell and ("reveal", *cell)
+
+    def observe(self, kind: str, x: int, y: int, changes) -> None:
+        """Получает результат хода: список изменений ChangeList. Случайной стратегии он не нужен"""
+
+
+class Analyser:
+    """
+    Анализ позиций с кэшем. Окрестность ячейки границы сначала ищется в таблице образцов, а если ее там нет,
+    решается перебором (patterns.solve_pattern), и ответ кладется в LRU-кэш по ключу окна 5x5 вокруг ячейки.
+    Решения связных компонент границы не кэшируются: ключ локального кэша - только окно 5x5.
+    Подсказка по всей позиции кэшируется по хэшу Зобриста видимой позиции (BoardModel.position_hash)
+    вместе с топологией, размером доски и количеством мин: при них анализ зависит только от открытых ячеек
+    и меток, поэтому повторная подсказка в той же позиции, после отмены ходов или в другой партии,
+    не пересчитывается.
+    """
+
+    def __init__(self, table: PatternTable = None, maxsize: int = 65536) -> None:
+        """
+        :param table: Таблица образцов, по умолчанию загружается из patterns.bin.
+        :param maxsize: Наибольшее количество записей в кэше анализа.
+        """
+        self.table = PatternTable.load() if table is None else table
+        self.cache = LRUCache(maxsize)
+
+    def local(self, model, x: int, y: int) -> list:
+        """Выводы из ограничений окрестности ячейки границы (x, y): [("reveal" или "flag", i, j)]"""
+        if model.topology.name != "square":
+            return self.single(model, x, y)
+        key = pattern_key(model, x, y)
+        found = self.table.get(key)
+        if found is None:
+            found = self.cache.get(key)
+            if found is None:
+                found = solve_pattern(key)
+                self.cache.put(key, found)
+        return window_moves(x, y, *found)
+
+    @staticmethod
+    def single(model, x: int, y: int) -> list:
+        """
+        Правила одной ячейки по таблице соседей модели. Окна образцов построены для квадратной доски,
+        поэтому на торе и шестиугольной доске решатель выводит только из них.
+        """
+        mines_left, unknown_count = model.constraint(x, y)
+        if mines_left and mines_left != unknown_count:
+            return []
+        kind = "flag" if mines_left else "reveal"
+        uncovered, marked = model.uncover_cells, model.marked_cells
+        return [(kind, i, j) for i, j in model.neighbors(x, y) if (i, j) not in uncovered and (i, j) not in marked]
+
+    def hint(self, model) -> tuple[list, list]:
+        """Возвращает (безопасные ячейки, мины), которые следуют из окрестностей всех ячеек границы"""
+        key = (model.topology_name, model.rows, model.cols, model.num_mines, model.position_hash)
+        found = self.cache.get(key)
+        if found is None:
+            safe, mines = set(), set()
+            for x, y in model.frontier:
+                for kind, i, j in self.local(model, x, y):
+                    (safe if kind == "reveal" else mines).add((i, j))
+            found = sorted(safe), sorted(mines)
+            self.cache.put(key, found)
+        return found
+
+
+class Solver(RandomStrategy):
+    """
+    Решатель по окрестностям: для ячейки границы выводит безопасные ячейки и мины из ограничений
+    открытых цифр окна 5x5 вокруг нее (Analyser.local), включая правила одной ячейки и образцы вида 1-1 и 1-2-1.
+    Когда выводов нет, делает случайный ход. Рассматривает только ячейки границы, ограничения которых
+    изменил последний ход (BoardModel.take_dirty), поэтому вывод не зависит от размера доски.
+    """
+
+    name = "solver"
+
+    def __init__(self, table: PatternTable = None) -> None:
+        """
+        :param table: Таблица образцов, по умолчанию загружается из patterns.bin.
+        """
+        super().__init__()
+        self.analyser = Analyser(table)
+        self.pending = set()
+        self.plan = deque()
+
+    @property
+    def cache_hits(self) -> int:
+        """Попадания в кэш анализа, их учитывает статистика серий и турниров"""
+        return self.analyser.cache.hits
+
+    @property
+    def cache_misses(self) -> int:
+        return self.analyser.cache.misses
+
+    def reset(self, game, seed: int = None) -> None:
+        super().reset(game, seed)
+        self.pending = set()
+        self.plan = deque()
+
+    def next_move(self) -> tuple:
+        model = self.game.model
+        while True:
+            while self.plan:
+                kind, x, y = self.plan.popleft()
+                if (x, y) not in model.uncover_cells and (x, y) not in model.marked_cells:
+                    return kind, x, y
+            if not self.pending:
+                self.pending = model.take_dirty()
+                if not self.pending:
+                    return super().next_move()
+            self.deduce(*self.pending.pop())
+
+    def deduce(self, x: int, y: int) -> None:
+        """Дополняет план ходов выводами из окрестности ячейки границы (x, y)"""
+        model = self.game.model
+        if (x, y) not in model.frontier:
+            return
+        self.plan.extend(self.analyser.local(model, x, y))
+
+
+STRATEGIES = {RandomStrategy.name: RandomStrategy, Solver.name: Solver}
@@ -0,0 +1,133 @@
+import queue
+import threading
+
+
+class Task:
+    """Задача для фонового потока. Отмененная задача не выполняется, а ее результат не доставляется"""
+
+    def __init__(self, key: str, func, args: tuple, on_done=None, on_error=None) -> None:
+        self.key = key
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+
+class TaskExecutor:
+    """
+    Выполняет тяжелые операции в фоновом потоке, чтобы окно не замирало.
+
+    Результаты возвращаются в поток Tk через очередь, которую опрашивает after, поэтому on_done и on_error
+    всегда вызываются в потоке Tk и могут трогать виджеты и модель. Для каждого ключа действует
+    "последний запрос побеждает": новая задача с тем же ключом отменяет предыдущую.
+    Функции задач не должны менять модель: они получают копии нужных данных и возвращают результат.
+    """
+
+    def __init__(self, widget, on_busy=None, poll_interval: int = 10) -> None:
+        """
+        :param widget: Виджет Tk, через after которого опрашивается очередь результатов.
+        :param on_busy: Функция, которая получает True, когда появляются задачи, и False, когда все выполнены.
+        :param poll_interval: Интервал опроса очереди результатов, в миллисекундах.
+        """
+        self.widget = widget
+        self.on_busy = on_busy
+        self.poll_interval = poll_interval
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.latest = {}
+        self.pending = 0
+        self.thread = None
+        self.poll_job = None
+
+    def submit(self, key: str, func, *args, on_done=None, on_error=None) -> Task:
+        """
+        Ставит func(*args) в очередь фонового потока.
+
+        :param key: Ключ задачи, предыдущая задача с этим ключом отменяется.
+        :param on_done: Функция, которая получит результат в потоке Tk.
+        :param on_error: Функция, которая получит исключение в потоке Tk. Без нее исключение
+            передается обработчику ошибок Tk.
+        """
+        self.cancel(key)
+        task = Task(key, func, args, on_done, on_error)
+        self.latest[key] = task
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.work, name="minesweeper-tasks", daemon=True)
+            self.thread.start()
+        self.jobs.put(task)
+        self.pending += 1
+        if self.pending == 1 and self.on_busy:
+            self.on_busy(True)
+        if self.poll_job is None:
+            self.poll_job = self.widget.after(self.poll_interval, self.poll)
+        return task
+
+    def cancel(self, key: str) -> None:
+        """Отменяет задачу с ключом key, если она еще не доставлена"""
+        task = self.latest.pop(key, None)
+        if task is not None:
+            task.cancel()
+
+    def is_pending(self, key: str) -> bool:
+        """Есть ли невыполненная или недоставленная задача с ключом key"""
+        return key in self.latest
+
+    @property
+    def busy(self) -> bool:
+        return self.pending > 0
+
+    def work(self) -> None:
+        """Цикл фонового потока"""
+        while True:
+            task = self.jobs.get()
+            if task is None:
+                return
+            result = error = None
+            if not task.cancelled.is_set():
+                try:
+                    result = task.func(*task.args)
+                except Exception as exception:
+                    error = exception
+            self.results.put((task, result, error))
+
+    def poll(self) -> None:
+        """Доставляет готовые результаты в потоке Tk и планирует следующий опрос, пока есть задачи"""
+        self.poll_job = None
+        try:
+            while True:
+                try:
+                    task, result, error = self.results.get_nowait()
+                except queue.Empty:
+                    break
+                self.pending -= 1
+                if task.cancelled.is_set():
+                    continue
+                del self.latest[task.key]
+                if error is None:
+                    if task.on_done:
+                        task.on_done(result)
+                elif task.on_error:
+                    task.on_error(error)
+                else:
+                    raise error
+        finally:
+            if self.pending:
+                # on_done мог поставить новую задачу и уже запланировать опрос
+                if self.poll_job is None:
+                    self.poll_job = self.widget.after(self.poll_interval, self.poll)
+            elif self.on_busy:
+                self.on_busy(False)
+
+    def shutdown(self) -> None:
+        """Отменяет все задачи и останавливает фоновый поток"""
+        for key in list(self.latest):
+            self.cancel(key)
+        if self.poll_job is not None:
+            self.widget.after_cancel(self.poll_job)
+            self.poll_job = None
+        if self.thread is not None:
+            self.jobs.put(None)
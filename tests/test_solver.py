@@ -0,0 +1,14 @@
+from headless import HeadlessGame
+from solver import RandomStrategy
+
+
+def test_random_guesses_do_not_follow_mines():
+    """Первые догадки случайной стратегии попадают в мины не чаще, чем случайные ячейки"""
+    game, strategy = HeadlessGame(9, 9, 10), RandomStrategy()
+    games, guesses, hits = 500, 5, 0
+    for seed in range(games):
+        game.new_game(seed)
+        strategy.reset(game, seed)
+        hits += sum(cell in game.model.mines_cells for cell in strategy.cells[-guesses:])
+    density = 10 / 81
+    assert hits / (games * guesses) < 1.5 * density
@@ -0,0 +1,25 @@
+import json
+
+import pytest
+
+from tournament import Tournament
+
+
+def make_config(games: int) -> dict:
+    return {"boards": {"Easy": [9, 9, 10], "Medium": [16, 16, 40]}, "strategy": "solver", "games": games,
+            "seed": 0, "chunk": 100}
+
+
+def test_solver_win_rates():
+    """Доли побед решателя в разумных пределах: из зерна доски не выводятся ни мины, ни безопасные ячейки"""
+    tournament = Tournament(make_config(400))
+    tournament.run(workers=1)
+    assert 0.65 < tournament.stats["Easy"].win_rate() < 0.92
+    assert 0.40 < tournament.stats["Medium"].win_rate() < 0.75
+
+
+def test_old_seed_scheme_checkpoint_is_rejected(tmp_path):
+    checkpoint = tmp_path / "tournament.json"
+    checkpoint.write_text(json.dumps({"config": make_config(400), "done": [], "stats": {}, "wall_time": 0.0}))
+    with pytest.raises(ValueError, match="seed scheme"):
+        Tournament(make_config(400), str(checkpoint)).resume()
@@ -0,0 +1,131 @@
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+# Наибольшая доска, для которой запоминаются соседи ячеек: у большей доски таблица заняла бы сотни мегабайт
+TABLE_CELLS = 250_000
+
+
+class Topology(ABC):
+    """
+    Соседство ячеек доски. Соседи ячейки с номером c = (x - 1) * cols + (y - 1) - это готовый кортеж table[c]
+    координат (i, j) только внутри доски. Кортеж вычисляется по смещениям при первом обращении к ячейке,
+    поэтому генерация доски строит только окрестности мин, а кортежи координат общие для всей таблицы.
+    Горячие циклы модели перебирают готовый кортеж, поэтому в них нет проверок границ,
+    а новая топология задает только offsets. Соседи ячеек доски больше TABLE_CELLS не запоминаются.
+    """
+
+    name = None
+    # Края доски соседствуют (wrap), тогда разные смещения могут дать одну ячейку и соседи проверяются на повтор
+    wraps = False
+
+    def __init__(self, rows: int, cols: int) -> None:
+        """
+        :param rows: Количество строк.
+        :param cols: Количество столбцов.
+        """
+        self.rows, self.cols = rows, cols
+        self.table = None
+        self.cells = None
+
+    @abstractmethod
+    def offsets(self, x: int, y: int) -> tuple:
+        """Смещения соседей ячейки (x, y)"""
+
+    def wrap(self, i: int, j: int) -> tuple:
+        """Координаты соседа (i, j) на доске или None, если он за краем"""
+        if 0 < i <= self.rows and 0 < j <= self.cols:
+            return i, j
+        return None
+
+    def around(self, x: int, y: int) -> tuple:
+        """Соседи ячейки (x, y), вычисленные по смещениям"""
+        if not self.wraps:
+            rows, cols = self.rows, self.cols
+            return tuple((x + di, y + dj) for di, dj in self.offsets(x, y)
+                         if 0 < x + di <= rows and 0 < y + dj <= cols)
+        found = []
+        for di, dj in self.offsets(x, y):
+            cell = self.wrap(x + di, y + dj)
+            # На маленьком торе разные смещения могут дать одну и ту же ячейку или саму ячейку
+            if cell is not None and cell != (x, y) and cell not in found:
+                found.append(cell)
+        return tuple(found)
+
+    def neighbors(self, x: int, y: int) -> tuple:
+        """Соседи ячейки (x, y)"""
+        table = self.table
+        if table is None:
+            if self.rows * self.cols > TABLE_CELLS:
+                return self.around(x, y)
+            table = self.table = [None] * (self.rows * self.cols)
+            self.cells = [(i, j) for i in range(1, self.rows + 1) for j in range(1, self.cols + 1)]
+        cols = self.cols
+        found = table[(x - 1) * cols + y - 1]
+        if found is None:
+            cells, rows = self.cells, self.rows
+            if self.wraps:
+                found = tuple(cells[(i - 1) * cols + j - 1] for i, j in self.around(x, y))
+            else:
+                found = tuple(cells[(x + di - 1) * cols + y + dj - 1] for di, dj in self.offsets(x, y)
+                              if 0 < x + di <= rows and 0 < y + dj <= cols)
+            table[(x - 1) * cols + y - 1] = found
+        return found
+
+    def degrees(self) -> list:
+        """Количество соседей каждой ячейки в матрице с границами из нулей, как доска модели"""
+        border = [0] * (self.cols + 2)
+        return [border] + [[0, *(len(self.neighbors(x, y)) for y in range(1, self.cols + 1)), 0]
+                           for x in range(1, self.rows + 1)] + [border[:]]
+
+
+class SquareTopology(Topology):
+    """Классическая доска: 8 соседей, за краем соседей нет"""
+
+    name = "square"
+    OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+
+    def offsets(self, x: int, y: int) -> tuple:
+        return self.OFFSETS
+
+    def degrees(self) -> list:
+        """Соседей столько, сколько ячеек в окне 3x3 вокруг ячейки внутри доски, кроме нее самой"""
+        if self.wraps:
+            return super().degrees()
+        rows, cols = self.rows, self.cols
+        spans = [min(y + 1, cols) - max(y - 1, 1) + 1 for y in range(1, cols + 1)]
+        border = [0] * (cols + 2)
+        heights = [min(x + 1, rows) - max(x - 1, 1) + 1 for x in range(1, rows + 1)]
+        return [border] + [[0, *(height * span - 1 for span in spans), 0] for height in heights] + [border[:]]
+
+
+class TorusTopology(SquareTopology):
+    """Доска, свернутая в тор: противоположные края соседствуют, у каждой ячейки 8 соседей"""
+
+    name = "torus"
+    wraps = True
+
+    def wrap(self, i: int, j: int) -> tuple:
+        return (i - 1) % self.rows + 1, (j - 1) % self.cols + 1
+
+
+class HexTopology(Topology):
+    """
+    Шестиугольные ячейки, строки со сдвигом: четные строки сдвинуты на полячейки вправо.
+    6 соседей: два в своей строке и по два в соседних.
+    """
+
+    name = "hex"
+    ODD_ROW = ((-1, -1), (-1, 0), (0, 1), (1, 0), (1, -1), (0, -1))
+    EVEN_ROW = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (0, -1))
+
+    def offsets(self, x: int, y: int) -> tuple:
+        return self.EVEN_ROW if x % 2 == 0 else self.ODD_ROW
+
+
+TOPOLOGIES = {topology.name: topology for topology in (SquareTopology, TorusTopology, HexTopology)}
+
+
+@lru_cache(maxsize=16)
+def get_topology(name: str, rows: int, cols: int) -> Topology:
+    """Таблица соседства для топологии и размера доски, строится один раз и используется всеми партиями"""
+    return TOPOLOGIES[name](rows, cols)
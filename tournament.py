@@ -0,0 +1,169 @@
+import json
+import math
+import os
+from multiprocessing import Pool
+from time import perf_counter
+
+from headless import BatchStats, HeadlessGame, play_game
+from solver import STRATEGIES
+
+# Схема зерен партий: меняется, когда из того же зерна получаются другие партии или ходы,
+# чтобы не продолжить checkpoint, разыгранный по старой схеме (2 - свой поток ходов у стратегии)
+SEED_SCHEME = 2
+
+# Состояние процесса-исполнителя: партия и стратегия переиспользуются между пакетами,
+# чтобы кэш решателя не сбрасывался на каждом пакете
+_worker_players = {}
+
+
+def play_chunk(task: tuple) -> tuple:
+    """
+    Играет пакет партий в процессе-исполнителе.
+
+    :param task: (номер пакета, сложность, rows, cols, mines, стратегия, первое зерно, количество партий).
+    :return: (номер пакета, сложность, статистика пакета в JSON).
+    """
+    key, difficulty, rows, cols, mines, strategy, first_seed, count = task
+    state_key = (rows, cols, mines, strategy)
+    if state_key not in _worker_players:
+        _worker_players[state_key] = HeadlessGame(rows, cols, mines), STRATEGIES[strategy]()
+    game, player = _worker_players[state_key]
+
+    stats = BatchStats()
+    hits, misses = getattr(player, "cache_hits", 0), getattr(player, "cache_misses", 0)
+    start = perf_counter()
+    for seed in range(first_seed, first_seed + count):
+        play_game(game, player, stats, seed)
+    stats.elapsed = perf_counter() - start
+    stats.add_cache_stats(player, hits, misses)
+    return key, difficulty, stats.to_json()
+
+
+def wilson_interval(wins: int, games: int, z: float = 1.96) -> tuple[float, float]:
+    """Доверительный интервал Уилсона для доли побед (по умолчанию 95%)"""
+    if not games:
+        return 0.0, 0.0
+    p = wins / games
+    denominator = 1 + z * z / games
+    center = (p + z * z / (2 * games)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denominator
+    return center - margin, center + margin
+
+
+class Tournament:
+    """
+    Турнир ботов: миллионы партий с зернами, разбитые на небольшие пакеты и разыгранные пулом процессов.
+    Пакеты раздаются по одному, освободившийся процесс сразу забирает следующий, поэтому
+    медленные пакеты не задерживают остальные. Результаты периодически сохраняются в checkpoint.
+    """
+
+    def __init__(self, config: dict, checkpoint: str = None, save_interval: float = 10.0) -> None:
+        """
+        :param config: Параметры турнира: boards ({сложность: [rows, cols, mines]}), strategy,
+            games (партий на сложность), seed (первое зерно), chunk (партий в пакете).
+            В него добавляется seed_scheme (SEED_SCHEME).
+        :param checkpoint: Путь к файлу checkpoint, если нужно сохранять прогресс.
+        :param save_interval: Как часто сохранять checkpoint, в секундах.
+        """
+        self.config = {**config, "seed_scheme": SEED_SCHEME}
+        self.checkpoint = checkpoint
+        self.save_interval = save_interval
+        self.done = set()
+        self.stats = {difficulty: BatchStats() for difficulty in config["boards"]}
+        self.wall_time = 0.0
+
+    def tasks(self) -> list[tuple]:
+        """Возвращает все пакеты турнира в детерминированном порядке"""
+        config = self.config
+        tasks = []
+        for difficulty, (rows, cols, mines) in config["boards"].items():
+            for first in range(0, config["games"], config["chunk"]):
+                count = min(config["chunk"], config["games"] - first)
+                tasks.append((len(tasks), difficulty, rows, cols, mines, config["strategy"],
+                              config["seed"] + first, count))
+        return tasks
+
+    def resume(self) -> bool:
+        """
+        Загружает прогресс из checkpoint. Возвращает False, если файла нет.
+        Если параметры в файле отличаются от текущих, продолжать нельзя.
+        """
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return False
+        with open(self.checkpoint, "r") as file:
+            data = json.load(file)
+        if data["config"].get("seed_scheme") != SEED_SCHEME:
+            raise ValueError(f"Checkpoint {self.checkpoint} was made with an older seed scheme, its results "
+                             f"can't be combined with new games")
+        if data["config"] != self.config:
+            raise ValueError(f"Checkpoint {self.checkpoint} was made with different settings")
+        self.done = set(data["done"])
+        self.stats = {difficulty: BatchStats.from_json(stats) for difficulty, stats in data["stats"].items()}
+        self.wall_time = data["wall_time"]
+        return True
+
+    def save(self) -> None:
+        """Атомарно сохраняет прогресс в checkpoint"""
+        if not self.checkpoint:
+            return
+        data = {
+            "config": self.config,
+            "done": sorted(self.done),
+            "stats": {difficulty: stats.to_json() for difficulty, stats in self.stats.items()},
+            "wall_time": self.wall_time,
+        }
+        temp = self.checkpoint + ".tmp"
+        with open(temp, "w") as file:
+            json.dump(data, file)
+        os.replace(temp, self.checkpoint)
+
+    def run(self, workers: int = None, progress=None) -> None:
+        """
+        Разыгрывает оставшиеся пакеты.
+
+        :param workers: Количество процессов (по умолчанию по числу ядер).
+        :param progress: Функция, вызываемая после каждого пакета с (сыграно партий, всего партий).
+        """
+        pending = [task for task in self.tasks() if task[0] not in self.done]
+        total = self.config["games"] * len(self.config["boards"])
+        start = last_save = perf_counter()
+        try:
+            with Pool(workers or os.cpu_count()) as pool:
+                for key, difficulty, data in pool.imap_unordered(play_chunk, pending, chunksize=1):
+                    self.stats[difficulty].merge(BatchStats.from_json(data))
+                    self.done.add(key)
+                    if progress:
+                        progress(sum(stats.games for stats in self.stats.values()), total)
+                    now = perf_counter()
+                    if now - last_save >= self.save_interval:
+                        self.wall_time += now - start
+                        start = last_save = now
+                        self.save()
+        finally:
+            self.wall_time += perf_counter() - start
+            self.save()
+
+    def report(self) -> str:
+        """Форматирует итоговую статистику по сложностям"""
+        total = BatchStats()
+        for stats in self.stats.values():
+            total.merge(stats)
+        per_second = total.games / self.wall_time if self.wall_time else 0.0
+        lines = [
+            f"Strategy {self.config['strategy']}, {total.games} games in {self.wall_time:.1f} s, "
+            f"{per_second:.1f} games/s",
+            f"{'Board':<10}{'Games':>12}{'Win rate':>10}{'95% CI':>18}{'Games/s/core':>14}{'us/move':>10}"
+            f"{'Cache hits':>12}",
+        ]
+        for difficulty, stats in self.stats.items():
+            lines.append(self.format_row(difficulty, stats))
+        lines.append(self.format_row("Total", total))
+        return "\n".join(lines)
+
+    @staticmethod
+    def format_row(name: str, stats: BatchStats) -> str:
+        """Строка отчета. Скорость считается по времени исполнителей, то есть на одно ядро"""
+        low, high = wilson_interval(stats.wins, stats.games)
+        return (f"{name:<10}{stats.games:>12}{stats.win_rate():>10.2%}{f'{low:.2%}-{high:.2%}':>18}"
+                f"{stats.games_per_second():>14.1f}{stats.time_per_move() * 1e6:>10.1f}"
+                f"{stats.cache_hit_rate():>12.2%}")
@@ -0,0 +1,142 @@
+import json
+import os
+from multiprocessing import Pool
+from time import perf_counter
+
+from headless import HeadlessGame
+
+MOVES = ("left", "right", "undo", "redo")
+
+
+def parse_time(time) -> float:
+    """Время заявки в секундах: число или строка "MM:SS", как в таблице рекордов"""
+    if isinstance(time, str):
+        minutes, seconds = time.split(":")
+        return int(minutes) * 60 + int(seconds)
+    return float(time)
+
+
+def verify_submission(submission: dict, tolerance: float = 0.5) -> tuple[bool, str]:
+    """
+    Проигрывает журнал ходов заявки на доске из ее зерна по правилам HeadlessGame и проверяет,
+    что партия выиграна последним ходом и заявленное время согласуется со временем ходов.
+
+    Таймер окна показывает целые секунды и останавливается на выигрышном ходе, поэтому заявленное
+    время не может быть больше времени последнего хода и меньше его больше чем на секунду.
+
+    :param submission: Заявка, как BoardModel.get_replay: rows, cols, mines, seed, time и moves
+        ([мс игрового времени, ход, x, y]).
+    :param tolerance: Допуск сравнения времени в секундах.
+    :return: (принята ли заявка, причина отказа или "ok").
+    """
+    try:
+        rows, cols, mines = int(submission["rows"]), int(submission["cols"]), int(submission["mines"])
+        seed = int(submission["seed"])
+        claimed = parse_time(submission["time"])
+        moves = submission["moves"]
+    except (KeyError, TypeError, ValueError) as error:
+        return False, f"malformed submission: {error}"
+    if not (0 < rows <= 1000 and 0 < cols <= 1000 and 0 < mines < rows * cols):
+        return False, f"board {rows}x{cols} can't hold {mines} mines"
+
+    game = HeadlessGame(rows, cols, mines, seed)
+    status = "play"
+    last = 0
+    for index, move in enumerate(moves):
+        try:
+            at, kind, x, y = int(move[0]), move[1], int(move[2]), int(move[3])
+        except (IndexError, TypeError, ValueError):
+            return False, f"move {index} is malformed"
+        if status == "win":
+            return False, f"move {index} comes after the win"
+        if kind not in MOVES:
+            return False, f"move {index} has unknown kind {kind!r}"
+        if at < last:
+            return False, f"move {index} goes back in time"
+        last = at
+        if kind == "undo":
+            if not game.undo():
+                return False, f"move {index} has nothing to undo"
+            status = "play"
+        elif kind == "redo":
+            status = game.redo()[0]
+        elif not (0 < x <= rows and 0 < y <= cols):
+            return False, f"move {index} is outside the board"
+        elif kind == "left":
+            status = game.reveal(x, y)[0]
+        else:
+            game.toggle_flag(x, y)
+    if status != "win":
+        return False, "moves don't win the game"
+    played = last / 1000
+    if not (played - 1 - tolerance <= claimed <= played + tolerance):
+        return False, f"claimed {claimed:.3f} s, moves took {played:.3f} s"
+    return True, "ok"
+
+
+def verify_chunk(task: tuple) -> list[tuple]:
+    """
+    Проверяет пакет заявок в процессе-исполнителе.
+
+    :param task: (номер первой строки, строки JSON, допуск времени).
+    :return: [(номер строки, принята ли заявка, причина)].
+    """
+    first, lines, tolerance = task
+    results = []
+    for number, line in enumerate(lines, first):
+        if not line.strip():
+            continue
+        try:
+            submission = json.loads(line)
+        except ValueError:
+            results.append((number, False, "not a JSON object"))
+            continue
+        if not isinstance(submission, dict):
+            results.append((number, False, "not a JSON object"))
+            continue
+        results.append((number, *verify_submission(submission, tolerance)))
+    return results
+
+
+class ReplayVerifier:
+    """
+    Проверка таблицы рекордов целиком: заявки из файла JSON lines раздаются пакетами пулу процессов.
+    Проигрывание идет без окна и отрисовки, поэтому одна партия проверяется за доли миллисекунды.
+    """
+
+    def __init__(self, tolerance: float = 0.5, chunk: int = 200) -> None:
+        """
+        :param tolerance: Допуск сравнения времени в секундах.
+        :param chunk: Сколько заявок получает процесс за раз.
+        """
+        self.tolerance = tolerance
+        self.chunk = chunk
+        self.checked = 0
+        self.accepted = 0
+        self.elapsed = 0.0
+
+    def verify_file(self, path: str, workers: int = None) -> list[tuple]:
+        """
+        Проверяет все заявки файла. Возвращает [(номер строки, принята ли заявка, причина)] в порядке строк.
+
+        :param path: Файл JSON lines с заявками, как их пишет окно игры с --submissions.
+        :param workers: Количество процессов (по умолчанию по числу ядер).
+        """
+        with open(path, "r") as file:
+            lines = file.readlines()
+        tasks = [(first + 1, lines[first:first + self.chunk], self.tolerance)
+                 for first in range(0, len(lines), self.chunk)]
+        results = []
+        start = perf_counter()
+        with Pool(workers or os.cpu_count()) as pool:
+            for chunk in pool.imap(verify_chunk, tasks):
+                results.extend(chunk)
+        self.elapsed += perf_counter() - start
+        self.checked += len(results)
+        self.accepted += sum(1 for _, accepted, _ in results if accepted)
+        return results
+
+    def report(self) -> str:
+        rate = self.checked / self.elapsed if self.elapsed else 0.0
+        return (f"{self.checked} submissions, {self.accepted} accepted, {self.checked - self.accepted} rejected "
+                f"in {self.elapsed:.2f} s ({rate:.0f}/s)")
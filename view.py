@@ -1,9 +1,12 @@
 import tkinter as tk
 from tkinter import ttk
 from functools import partial
-from time import time
+from collections import deque
+from time import time, perf_counter
 import json
 
+from changes import MINE, LOST_MINE, EXPLODED, WRONG_FLAG, FLAG, UNFLAG, COVER, LOCK
+
 
 class MinesweeperView(tk.Tk):
     """Главный класс View, отвечает за поведение главного окна, также через него
@@ -14,6 +17,8 @@ class MinesweeperView(tk.Tk):
         self.withdraw()
         self.controller = controller
         self.modal = None
+        self.scoreboard = None
+        self.overlay = None
         self.title("Minesweeper")
 
         self.style = UIStyles(self)
@@ -25,6 +30,11 @@ class MinesweeperView(tk.Tk):
         self.game_field.make_all_buttons()
         self.update_window_size()
         self.bottom_panel.timer.update_timer()
+        self.bind("<Configure>", self.on_main_window_move)
+        self.bind("<Control-z>", self.controller.undo_handler)
+        self.bind("<Control-y>", self.controller.redo_handler)
+        self.bind("<Control-Z>", self.controller.redo_handler)
+        self.bind("<F12>", self.toggle_overlay)
         self.deiconify()
 
     def update_window_size(self) -> None:
@@ -39,16 +49,28 @@ class MinesweeperView(tk.Tk):
     def show_table_with_score(self, records: json, user: [str, None]) -> [json, None]:
         """Вызывает модальное окно с таблицей со счетом.
         Ждет от функции ниже ответ и возвращает его, либо json с новым временем либо None"""
-        scoreboard = ViewScoreboard(self, records, user)
-        self.bind("<Configure>", scoreboard.on_main_window_move)
-        return scoreboard.make_scoreboard()
+        if self.scoreboard is None:
+            self.scoreboard = ViewScoreboard(self)
+        return self.scoreboard.make_scoreboard(records, user)
+
+    def toggle_overlay(self, event=None):
+        """Показывает или прячет окно отладки с метриками поверх поля"""
+        if self.overlay is None:
+            self.overlay = DebugOverlay(self, self.controller)
+        self.overlay.toggle()
 
     def modal_instance(self):
-        """Общие параметры для модальных окон"""
-        self.modal = Modal(self)
-        self.bind("<Configure>", self.modal.on_main_window_move)
+        """Общие параметры для модальных окон. Окно создается один раз и потом только показывается"""
+        if self.modal is None:
+            self.modal = Modal(self)
         return self.modal
 
+    def on_main_window_move(self, event):
+        """Передвигает показанные всплывающие окна вслед за главным"""
+        for popup in (self.modal, self.scoreboard):
+            if popup is not None:
+                popup.on_main_window_move(event)
+
     def new_game_notify(self):
         """Вызывает модальное окно с запросом нужно ли начинать новую игру"""
         return self.modal_instance().new_game_modal()
@@ -67,21 +89,29 @@ class MinesweeperView(tk.Tk):
 
 
 class Modal(tk.Toplevel):
-    """Класс с модальными окнами и уведомлениями"""
+    """Класс с модальными окнами и уведомлениями. Окно не уничтожается при закрытии, а скрывается,
+    содержимое каждого вида окна создается при первом показе"""
 
     def __init__(self, master, *args):
         super().__init__(master, *args)
+        self.withdraw()
         self.transient(master)
         self.resizable(False, False)
         self.title = ""
         self.configure(bg="#272727")
         self.response = None
+        self.shown = False
+        self.closed = tk.BooleanVar(self, value=False)
+        self.hide_job = None
+        self.pages = {}
+        self.shown_page = None
+        self.notification_label = None
+        self.protocol("WM_DELETE_WINDOW", self.hide)
 
     def on_main_window_move(self, event):
         """Обработчик события перемещения основного окна"""
-        for win in self.master.winfo_children():
-            if isinstance(win, tk.Toplevel):
-                self.update_popup_size()
+        if self.shown:
+            self.update_popup_size()
 
     def update_popup_size(self):
         """Устанавливает координаты всплывающего окна"""
@@ -97,40 +127,95 @@ class Modal(tk.Toplevel):
         self.update_popup_size()
         self.grab_set()
 
+    def get_page(self, name: str, build) -> ttk.Frame:
+        """Возвращает содержимое окна name, при первом обращении создает его функцией build(frame)"""
+        if name not in self.pages:
+            frame = ttk.Frame(self, style="Header.TFrame")
+            build(frame)
+            self.pages[name] = frame
+        return self.pages[name]
+
+    def show(self, page: str = None, block: bool = True) -> None:
+        """
+        Показывает окно с содержимым page (None - окно без страниц).
+        Если block, блокирует основное окно и ждет закрытия.
+        """
+        if self.hide_job is not None:
+            self.after_cancel(self.hide_job)
+            self.hide_job = None
+        if page != self.shown_page:
+            if self.shown_page is not None:
+                self.pages[self.shown_page].pack_forget()
+            self.pages[page].pack(expand=True, fill="both")
+            self.shown_page = page
+        self.response = None
+        self.shown = True
+        self.update_idletasks()
+        self.update_popup_size()
+        # Уже показанное окно не получит нового VisibilityNotify, и wait_visibility ждал бы вечно
+        mapped = self.winfo_viewable()
+        self.deiconify()
+        if block:
+            self.block_main_window()
+            self.wait_variable(self.closed)
+        elif not mapped:
+            self.wait_visibility()
+
+    def hide(self) -> None:
+        """Скрывает окно и завершает ожидание в show"""
+        if self.hide_job is not None:
+            self.after_cancel(self.hide_job)
+            self.hide_job = None
+        if not self.shown:
+            return
+        self.shown = False
+        self.grab_release()
+        self.withdraw()
+        self.closed.set(True)
+
     def modal_handler(self, event: str):
         """Закрывает диалоговое окно"""
         self.response = True if event == "YES" else False
-        self.destroy()
+        self.hide()
 
     def new_game_modal(self):
         """Спрашивает нужно ли начинать новую игру, если игра уже идет"""
-
-        ttk.Label(self, text="Start a new game?", style="White.TLabel").pack(padx=10, pady=10)
-        container = ttk.Frame(self, style="Header.TFrame")
-        container.pack(padx=10)
-        self.make_modal_btn(container, "YES", "Dark2.TButton", self.modal_handler)
-        self.make_modal_btn(container, "NO", "Dark2.TButton", self.modal_handler)
-        self.block_main_window()
-        self.wait_window()
+        def build(frame):
+            ttk.Label(frame, text="Start a new game?", style="White.TLabel").pack(padx=10, pady=10)
+            container = ttk.Frame(frame, style="Header.TFrame")
+            container.pack(padx=10)
+            self.make_modal_btn(container, "YES", "Dark2.TButton", self.modal_handler)
+            self.make_modal_btn(container, "NO", "Dark2.TButton", self.modal_handler)
+
+        self.get_page("new_game", build)
+        self.show("new_game")
         return self.response
 
     def paused_modal(self):
-        """Уведомляет о выигрыше или выигрыше"""
-        label = ttk.Label(self, text="Paused", style="White.TLabel", anchor="center", justify="center", width=25)
-        label.pack(expand=True, fill="both", pady=10)
-        container = ttk.Frame(self, style="Header.TFrame")
-        container.pack(padx=10, pady=5)
-        self.make_modal_btn(container, "Cancel", "Dark2.TButton", self.modal_handler)
-        self.block_main_window()
-        self.wait_window()
+        """Окно паузы, закрывается кнопкой Cancel"""
+        def build(frame):
+            label = ttk.Label(frame, text="Paused", style="White.TLabel", anchor="center", justify="center",
+                              width=25)
+            label.pack(expand=True, fill="both", pady=10)
+            container = ttk.Frame(frame, style="Header.TFrame")
+            container.pack(padx=10, pady=5)
+            self.make_modal_btn(container, "Cancel", "Dark2.TButton", self.modal_handler)
+
+        self.get_page("paused", build)
+        self.show("paused")
 
     def notification(self, _text: str):
-        """Уведомляет о выигрыше или выигрыше"""
-        label = ttk.Label(self, text=_text, style="White.TLabel", anchor="center", justify="center", width=25)
-        label.pack(expand=True, fill="both", pady=35)
-        self.after(1500, self.destroy)
-        self.wait_visibility()
-        self.update_popup_size()
+        """Уведомляет о выигрыше или проигрыше"""
+        def build(frame):
+            self.notification_label = ttk.Label(frame, style="White.TLabel", anchor="center", justify="center",
+                                                width=25)
+            self.notification_label.pack(expand=True, fill="both", pady=35)
+
+        self.get_page("notification", build)
+        if self.notification_label["text"] != _text:
+            self.notification_label["text"] = _text
+        self.show("notification", block=False)
+        self.hide_job = self.after(1500, self.hide)
 
     @staticmethod
     def make_modal_btn(master, text_btn: str, style_btn: str, handler):
@@ -145,28 +230,49 @@ class ViewScoreboard(Modal):
     """Этот класс представляет таблицу рекордов в виде интерфейса, который работает с JSON-файлом
     в качестве базы данных для хранения рекордов игроков. При внесении изменений,
     таких как установка нового рекорда, класс обновляет соответствующие данные в JSON-файле и возвращает его.
-    Если изменений не было, возвращается None."""
+    Если изменений не было, возвращается None.
+    Окно создается один раз, при следующих показах обновляются только изменившиеся метки.
+    Таблица уровня сложности читается из records, только когда открывается ее страница."""
 
-    def __init__(self, master, records: json, user: [str, None]) -> None:
+    def __init__(self, master) -> None:
         """
         :param master: Родительский виджет
-        :param records: Таблица рекордов
-        :param user: Указывает, от кого приходит вызов ("root" или None)
         """
         super().__init__(master)
-        self.user = user
-        self.records = records
+        self.user = None
+        self.records = None
         self.tables = {}
         self.bottom_containers = {}
-        self.current_page = records["CurrentDifficulty"]
-        self.user_input = tk.StringVar(value=self.records["LastPlayer"])
+        self.current_page = None
+        self.user_input = tk.StringVar()
+        self.entries = {}
         self.entry = None
         self.entry_difficulty_page = None
         self.keys = ["Easy", "Medium", "Hard"]
-        self.labels = {k: {1: [], 2: []} for k in self.keys}
+        self.columns = [("Name", 10), ("Time", 5), ("3BV", 4), ("3BV/s", 5), ("Eff", 4)]
+        self.labels = {k: {col: [] for col in range(1, len(self.columns) + 1)} for k in self.keys}
+        # Тексты меток хранятся отдельно, чтобы сравнивать их без обращения к Tk
+        self.texts = {k: {col: [] for col in range(1, len(self.columns) + 1)} for k in self.keys}
+
+    def make_scoreboard(self, records: json, user: [str, None]):
+        """
+        Показывает модальное окно с таблицей рекордов и ждет его закрытия.
+
+        :param records: Таблица рекордов
+        :param user: Указывает, от кого приходит вызов ("root" или None)
+        """
+        self.user = user
+        self.records = records
+        self.user_input.set(records["LastPlayer"])
+        if not self.tables:
+            self.build_scoreboard()
+        self.menu_btn_handler(self.tables[records["CurrentDifficulty"]]["button"], records["CurrentDifficulty"])
+        self.behavior_of_the_bottom_buttons()
+        self.show()
+        return self.response  # <<<---- Возврат здесь
 
-    def make_scoreboard(self):
-        """Функция для создания модального окна с таблицей рекордов"""
+    def build_scoreboard(self):
+        """Создает все элементы окна при первом показе"""
         inner = tk.Frame(self, padx=10, pady=10, bg="#272727")
         inner.pack(side="top", fill="y")
         frame_menu_btn = tk.Frame(inner, bg="#383838")
@@ -174,13 +280,31 @@ class ViewScoreboard(Modal):
         for key in self.keys:
             self.tables[key] = {"button": self.make_menu_button(frame_menu_btn, key),
                                 "table": self.make_table(inner, key)}
-        self.menu_btn_handler(self.tables[self.current_page]["button"], self.current_page)
         self.make_trash_button()
         self.make_bottom_containers()
-        self.behavior_of_the_bottom_buttons()
-        self.block_main_window()
-        self.wait_window()
-        return self.response  # <<<---- Возврат здесь
+
+    def refresh_table(self, key: str):
+        """Обновляет тексты меток страницы key по таблице рекордов"""
+        for row_index, row_data in enumerate(self.records[key]):
+            for col_index, cell_data in enumerate(row_data, start=1):
+                self.set_label(key, col_index, row_index, self.format_cell(col_index, cell_data))
+
+    def set_label(self, key: str, col_index: int, row_index: int, text: str):
+        """Меняет текст метки, только если он отличается от показанного"""
+        if self.texts[key][col_index][row_index] != text:
+            self.texts[key][col_index][row_index] = text
+            self.labels[key][col_index][row_index].configure(text=text)
+
+    def show(self, page: str = None, block: bool = True) -> None:
+        super().show(page, block)
+        if self.entry is not None:
+            self.entry.focus_set()
+
+    def hide(self) -> None:
+        if self.entry is not None:
+            self.entry.grid_remove()
+            self.entry = None
+        super().hide()
 
     def make_trash_button(self):
         """Создает кнопку корзины"""
@@ -191,13 +315,14 @@ class ViewScoreboard(Modal):
 
     def trash_handler(self):
         """Описывает поведение кнопки корзины"""
-        self.records[self.current_page] = [["-", "-"] for _ in range(10)]
-        for col in (1, 2):
-            for label in self.labels[self.current_page][col]:
-                label["text"] = "-"
+        self.records[self.current_page] = [["-"] * len(self.columns) for _ in range(10)]
+        for col in self.labels[self.current_page]:
+            for row_index in range(10):
+                self.set_label(self.current_page, col, row_index, "-")
         if self.entry and (self.current_page == self.entry_difficulty_page):
             self.switch_bottom_container("two", "one")
-            self.entry.destroy()
+            self.entry.grid_remove()
+            self.entry = None
         self.response = self.records
 
     def behavior_of_the_bottom_buttons(self):
@@ -227,15 +352,18 @@ class ViewScoreboard(Modal):
         }
 
     def make_entry_field(self):
-        """Создает поле для ввода имени игрока"""
-        entry = ttk.Entry(self.tables[self.records["CurrentDifficulty"]]["table"],
-                          style="Input.TEntry", width=9, textvariable=self.user_input)
+        """Показывает поле для ввода имени игрока, поле для каждой таблицы создается один раз"""
+        difficulty = self.records["CurrentDifficulty"]
+        entry = self.entries.get(difficulty)
+        if entry is None:
+            entry = ttk.Entry(self.tables[difficulty]["table"], style="Input.TEntry", width=9,
+                              textvariable=self.user_input)
+            strip = entry.register(lambda text: len(text) <= 10)
+            entry.config(validate="key", validatecommand=(strip, "%P"))
+            self.entries[difficulty] = entry
         entry.grid(row=self.records["Index"] + 1, column=1, sticky="we")
         entry.select_range(0, tk.END)
         entry.icursor(tk.END)
-        entry.focus_set()
-        strip = entry.register(lambda text: len(text) <= 10)
-        entry.config(validate="key", validatecommand=(strip, "%P"))
         self.entry = entry
         self.entry_difficulty_page = self.current_page
 
@@ -255,7 +383,7 @@ class ViewScoreboard(Modal):
     def make_table(self, master, key: str):
         """Создает контейнер с таблицей рекордов"""
         frame = tk.Frame(master, bg="#383838", padx=10, pady=5)
-        headers = ["Rank", "Name", "Time"]
+        headers = ["Rank"] + [name for name, _ in self.columns]
 
         for i, header in enumerate(headers):
             label = ttk.Label(frame, text=header, style="TableHeader.TLabel")
@@ -265,18 +393,27 @@ class ViewScoreboard(Modal):
             label = ttk.Label(frame, text=f"#{i}", style="TableRow.TLabel")
             label.grid(row=i, column=0, padx=5, pady=1, sticky="w")
 
-        for row_index, row_data in enumerate(self.records[key], start=1):
-            for col_index, cell_data in enumerate(row_data, start=1):
-                label = ttk.Label(frame, text=cell_data, style="TableRow.TLabel")
+        # Метки создаются пустыми, тексты появляются при первом открытии страницы (refresh_table)
+        for row_index in range(1, 11):
+            for col_index, (_, width) in enumerate(self.columns, start=1):
+                label = ttk.Label(frame, text="-", style="TableRow.TLabel", width=width)
                 # Здесь добавляем ссылку на метку в хэш таблицу
                 self.labels[key][col_index].append(label)
-                if col_index == 1:
-                    label.configure(width=10)
-                if col_index == 2:
-                    label.configure(width=5)
+                self.texts[key][col_index].append("-")
                 label.grid(row=row_index, column=col_index, padx=5, pady=1, sticky="w")
         return frame
 
+    @staticmethod
+    def format_cell(col_index: int, value) -> str:
+        """Форматирует значение ячейки таблицы: эффективность в процентах, 3BV/s с двумя знаками"""
+        if value == "-":
+            return value
+        if col_index == 4:
+            return f"{value:.2f}"
+        if col_index == 5:
+            return f"{value:.0%}"
+        return str(value)
+
     def control_btn_handler(self, event):
         """Обработчик кнопок для взаимодействия с игроком"""
         if event == "Save":
@@ -289,18 +426,20 @@ class ViewScoreboard(Modal):
                 self.records[cur_page][idx][0] = inp_name
                 self.response = self.records
 
-                label = self.labels[cur_page][1][idx]
-                label.configure(text=inp_name)
-                self.entry.destroy()
+                self.set_label(cur_page, 1, idx, inp_name)
+                self.entry.grid_remove()
+                self.entry = None
                 self.switch_bottom_container("two", "one")
         else:
-            self.destroy()
+            self.hide()
 
     def menu_btn_handler(self, event, key):
         """Обработчик для кнопок меню"""
-        self.tables[self.current_page]["button"].config(bg="#272727")
-        self.tables[self.current_page]["table"].pack_forget()
+        if self.current_page is not None:
+            self.tables[self.current_page]["button"].config(bg="#272727")
+            self.tables[self.current_page]["table"].pack_forget()
         self.current_page = key
+        self.refresh_table(key)
         self.tables[self.current_page]["button"].config(bg="#383838")
         self.tables[key]["table"].pack(side="left", fill="both", expand=True)
 
@@ -332,6 +471,10 @@ class TopPanel(ttk.Frame):
         self.make_header_button(left_block, "Pause", (1, 2), self.controller.pause_game_handler)
         ttk.Button(left_block, text="📌", width=2, style="Dark.TButton", takefocus=False,
                    command=self.controller.score_game_handler).grid(row=1, column=3)
+        ttk.Button(left_block, text="↶", width=2, style="Dark.TButton", takefocus=False,
+                   command=partial(self.controller.undo_handler, None)).grid(row=1, column=4)
+        ttk.Button(left_block, text="↷", width=2, style="Dark.TButton", takefocus=False,
+                   command=partial(self.controller.redo_handler, None)).grid(row=1, column=5)
 
     def make_combobox(self):
         """Создает combobox в правом углу панели"""
@@ -368,6 +511,12 @@ class BottomPanel(ttk.Frame):
         self.timer.pack(side=tk.LEFT, padx=5)
         self.bomb_counter = BombsCounter(self.inner_frame, controller)
         self.bomb_counter.pack(side=tk.LEFT, padx=5)
+        self.busy_text = tk.StringVar()
+        ttk.Label(self.inner_frame, textvariable=self.busy_text, style="White.TLabel", width=2).pack(side=tk.LEFT)
+
+    def set_busy(self, busy: bool) -> None:
+        """Показывает индикатор, пока в фоновом потоке выполняются задачи"""
+        self.busy_text.set("⏳" if busy else "")
 
 
 class BombsCounter(ttk.Frame):
@@ -385,10 +534,15 @@ class BombsCounter(ttk.Frame):
         label.pack()
         self.clear_bomb_counter()
 
-    def update_bomb_counter(self, value: str):
+    def update_bomb_counter(self, value: bool):
         self.counter += 1 if value else -1
         self.screen_counter.set(f"Mines: {self.counter}/{self.total_bombs}")
 
+    def set_bomb_counter(self, count: int):
+        """Показывает количество меток восстановленной партии"""
+        self.counter = count
+        self.screen_counter.set(f"Mines: {self.counter}/{self.total_bombs}")
+
     def clear_bomb_counter(self):
         self.counter = 0
         self.total_bombs = self.controller.get_bombs_amount()
@@ -428,6 +582,13 @@ class Timer(ttk.Frame):
                 self.start_time += time() - self.pause_time
             self.update_timer()
 
+    def resume_timer(self, seconds: float):
+        """Продолжает отсчет восстановленной партии с сохраненного времени"""
+        self.start_time = time() - seconds
+        self.pause_time = None
+        self.running = True
+        self.update_timer()
+
     def stop_timer(self):
         """Останавливает таймер"""
         if self.running:
@@ -440,6 +601,13 @@ class Timer(ttk.Frame):
         self.running = False
         self.start_time = None
 
+    def get_elapsed(self) -> float:
+        """Возвращает прошедшее время в секундах с учетом пауз"""
+        if self.start_time is None:
+            return 0.0
+        end = time() if self.running else self.pause_time
+        return end - self.start_time
+
     def get_strip_time(self):
         """Возвращает обрезанное время"""
         return self.screen_time.get()[-5:]
@@ -456,7 +624,14 @@ class GameField(ttk.Frame):
         self.buttons_container = self.make_container_for_buttons()
         self.max_n, self.max_m = 16, 30
         self.n, self.m = None, None
-        self.neighbors = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+
+        # Очередь открытия ячеек, которая обрабатывается частями между событиями:
+        # списки [номера ячеек, коды, позиция первого необработанного изменения]
+        self.reveal_queue = deque()
+        self.reveal_callbacks = []
+        self.reveal_job = None
+        self.reveal_budget = 0.008  # секунд на одну порцию, чтобы окно успевало обрабатывать ввод
+        self.render_time = 0.0  # время отрисовки текущей очереди по всем порциям, для метрик
 
     def make_container_for_buttons(self) -> ttk.Frame:
         """Создает контейнер для игрового поля"""
@@ -482,65 +657,80 @@ class GameField(ttk.Frame):
 
     def update_buttons(self):
         """Включает или выключает кнопки в зависимости от уровня сложности"""
+        self.cancel_reveal()
         self.n, self.m = self.controller.get_field_size()
         for i in range(self.max_n):
             for j in range(self.max_m):
                 if i < self.n and j < self.m:
                     btn = self.buttons[i][j]
-                    self.update_btn_value(btn)
+                    btn.reload_button()
                     btn.grid(row=i, column=j)
                 else:
                     self.buttons[i][j].grid_forget()
 
-    def update_btn_value(self, button) -> None:
-        """Отправляет запрос в контроллер, для получения значения в ячейке"""
-        button.reload_button(self.controller.get_cell_value(button.coord_x, button.coord_y))
-
-    def uncover_the_clearing(self, coord: set) -> None:
-        """Принимает координаты и открывает просеку по ним"""
-        for i, j in coord:
-            btn = self.buttons[i][j]
-            btn.uncover_button()
-
-    def uncover_all_buttons(self) -> None:
-        """Открывает все ячейки при победе"""
-        [self.buttons[i][j].uncover_button() for i in range(self.n) for j in range(self.m)]
-
-    def uncover_all_mines(self, hashset: set) -> None:
-        """Открывает все ячейки с минами при поражении, остальные блокирует"""
-        for i in range(self.n):
-            for j in range(self.m):
-                btn = self.buttons[i][j]
-                if (btn.coord_x, btn.coord_y) in hashset:
-                    btn.uncover_bomb()
-                elif btn.bomb_mark:
-                    btn.wrong_label()
-                elif not btn.is_open:
-                    btn.disable_button()
-
-    def highlight_explosion(self, button):
-        """Подсвечивает ячейки на которых подорвался игрок"""
-        if button.is_bomb:
-            return button.bomb_exploded()
-        x, y = button.coord_x - 1, button.coord_y - 1
-        for di, dj in self.neighbors:
-            i, j = x + di, y + dj
-            if 0 <= i < self.n and 0 <= j < self.m:
-                btn = self.buttons[i][j]
-                if btn.is_bomb and not btn.bomb_mark:
-                    btn.bomb_exploded()
-
-    def get_coordinates_marked_bombs_nearby(self, x: int, y: int) -> set:
-        """Проверяет соседние ячейки на метку, возвращает set с координатами
-        помеченных игроком ячеек. x, y координаты самой себя"""
-        bombs_set = set()
-        x -= 1
-        y -= 1
-        for di, dj in self.neighbors:
-            i, j = x + di, y + dj
-            if 0 <= i < self.n and 0 <= j < self.m and self.buttons[i][j].bomb_mark:
-                bombs_set.add((self.buttons[i][j].coord_x, self.buttons[i][j].coord_y))
-        return bombs_set
+    def apply_changes(self, changes, on_done=None) -> None:
+        """
+        Отрисовывает список изменений модели (ChangeList) в его порядке.
+
+        :param changes: Номера ячеек и коды их новых состояний.
+        :param on_done: Функция, которая вызывается после отрисовки всех изменений.
+        """
+        self.stream_reveal(changes.cells, changes.codes, 0, on_done)
+
+    def stream_reveal(self, cells, codes, start: int = 0, on_done=None) -> None:
+        """
+        Ставит в очередь изменения кнопок. Очередь обрабатывается порциями через after,
+        поэтому большое открытие не блокирует обработку ввода. Очередь хранит сами массивы ChangeList,
+        без записи на каждую ячейку, а кнопки находятся по номерам ячеек при отрисовке порции.
+
+        :param cells: Номера ячеек в порядке отрисовки (массив ChangeList.cells).
+        :param codes: Коды новых состояний ячеек (массив ChangeList.codes).
+        :param start: Позиция первого изменения для отрисовки.
+        :param on_done: Функция, которая вызывается после обработки всех кнопок в очереди.
+        """
+        if start < len(cells):
+            self.reveal_queue.append([cells, codes, start])
+        if on_done:
+            self.reveal_callbacks.append(on_done)
+        if self.reveal_job is None:
+            self.reveal_job = self.after_idle(self.reveal_step)
+
+    def reveal_step(self) -> None:
+        """Открывает очередную порцию кнопок и планирует следующую"""
+        queue, buttons, m = self.reveal_queue, self.buttons, self.m
+        start = perf_counter()
+        deadline = start + self.reveal_budget
+        while queue:
+            entry = queue[0]
+            cells, codes, first = entry
+            last = min(first + 16, len(cells))
+            for index in range(first, last):
+                cell = cells[index]
+                buttons[cell // m][cell % m].apply_change(codes[index])
+            if last == len(cells):
+                queue.popleft()
+            else:
+                entry[2] = last
+            if perf_counter() > deadline:
+                self.render_time += perf_counter() - start
+                # Задержка в 1 мс дает Tk выполнить перерисовку и обработать ввод до следующей порции
+                self.reveal_job = self.after(1, self.reveal_step)
+                return
+        self.reveal_job = None
+        self.controller.render_done(self.render_time + perf_counter() - start)
+        self.render_time = 0.0
+        callbacks, self.reveal_callbacks = self.reveal_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def cancel_reveal(self) -> None:
+        """Отменяет незавершенное открытие, например при старте новой игры"""
+        if self.reveal_job is not None:
+            self.after_cancel(self.reveal_job)
+            self.reveal_job = None
+        self.reveal_queue.clear()
+        self.render_time = 0.0
+        self.reveal_callbacks = []
 
 
 class GameFieldButton(ttk.Button):
@@ -548,6 +738,8 @@ class GameFieldButton(ttk.Button):
 
     mark = "💣"
     error = "❌"
+    # Вызовы configure у всех кнопок поля, для метрик
+    configures = 0
 
     style_map = {
         "1": "One", "2": "Two", "3": "Three", "4": "Four", "5": "Five",
@@ -560,17 +752,39 @@ class GameFieldButton(ttk.Button):
         self.coord_y = y
         self.value = None
         self.is_open = False
-        self.is_bomb = None
         self.bomb_mark = False
 
-    def reload_button(self, value: int):
-        """Устанавливает дефолтные параметры для кнопки"""
-        self.value = self.set_button_value(value)
+    def configure(self, cnf=None, **kw):
+        GameFieldButton.configures += 1
+        return super().configure(cnf, **kw)
+
+    def reload_button(self):
+        """Устанавливает дефолтные параметры для кнопки. Значение придет вместе с открытием"""
+        self.value = None
         self.is_open = False
-        self.is_bomb = True if self.value == GameFieldButton.mark else False
         self.bomb_mark = False
         self.configure(text="", state="normal", style="Default.TButton")
 
+    def apply_change(self, code: int):
+        """Применяет к кнопке код нового состояния из списка изменений модели"""
+        if code <= MINE:
+            self.value = self.set_button_value(code)
+            self.uncover_button()
+        elif code == LOST_MINE:
+            self.value = GameFieldButton.mark
+            self.uncover_bomb()
+        elif code == EXPLODED:
+            self.value = GameFieldButton.mark
+            self.bomb_exploded()
+        elif code == WRONG_FLAG:
+            self.wrong_label()
+        elif code == FLAG or code == UNFLAG:
+            self.mark_the_bomb(code == FLAG)
+        elif code == COVER:
+            self.reload_button()
+        elif code == LOCK:
+            self.disable_button()
+
     def uncover_button(self):
         """Открывает значение value и блокирует кнопку"""
         self.configure(text=self.value, state="normal",
@@ -579,10 +793,10 @@ class GameFieldButton(ttk.Button):
             self.configure(state="disabled")
         self.is_open = True
 
-    def mark_the_bomb(self):
-        """Ставит или снимает бомбу по правому клику"""
-        self["text"] = "" if self["text"] else GameFieldButton.mark
-        self.bomb_mark = not self.bomb_mark
+    def mark_the_bomb(self, status: bool):
+        """Ставит или снимает бомбу по правому клику, status - состояние метки в модели"""
+        self["text"] = GameFieldButton.mark if status else ""
+        self.bomb_mark = status
 
     def uncover_bomb(self):
         """Открывает кнопку с бомбой"""
@@ -613,6 +827,30 @@ class GameFieldButton(ttk.Button):
         return str(value)
 
 
+class DebugOverlay(tk.Label):
+    """Окно отладки поверх поля (F12): сводка метрик контроллера, обновляется раз в полсекунды"""
+
+    def __init__(self, master, controller):
+        super().__init__(master, justify="left", anchor="nw", bg="#000000", fg="#7CFC00",
+                         font=("Courier", 9), padx=6, pady=4)
+        self.controller = controller
+        self.job = None
+
+    def toggle(self):
+        if self.job is None:
+            self.place(relx=1.0, rely=0.0, anchor="ne")
+            self.refresh()
+        else:
+            self.after_cancel(self.job)
+            self.job = None
+            self.place_forget()
+
+    def refresh(self):
+        self.configure(text=self.controller.get_metrics_summary())
+        self.lift()
+        self.job = self.after(500, self.refresh)
+
+
 class UIStyles(ttk.Style):
     """Стили для ViewUI"""
 